@@ -0,0 +1,80 @@
+"""
+Async data-access layer for the SNS API.
+
+Exposes the same functions as database.py as coroutines. Each call runs the
+synchronous sqlite3 code on a dedicated thread pool sized to the connection
+pool, so queries no longer block the event loop.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import database
+from db_pool import DB_POOL_SIZE
+from metrics import db_executor_wait, timed_db_call
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the database thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="sns-db")
+    return _executor
+
+
+def shutdown_executor():
+    """Wait for in-flight queries and stop the database thread pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def run_in_db_thread(func: Callable) -> Callable:
+    """Wrap a synchronous database function as a coroutine running on the database thread pool.
+
+    Each call records how long it waited for a thread and how long the
+    function itself took.
+    """
+    timed = timed_db_call(func)
+    
+    def run(queued_at: float, args: tuple, kwargs: dict):
+        db_executor_wait.observe(time.perf_counter() - queued_at)
+        return timed(*args, **kwargs)
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), run, time.perf_counter(), args, kwargs)
+    return wrapper
+
+
+get_all_posts = run_in_db_thread(database.get_all_posts)
+get_all_posts_rows = run_in_db_thread(database.get_all_posts_rows)
+create_post = run_in_db_thread(database.create_post)
+create_posts_batch = run_in_db_thread(database.create_posts_batch)
+get_post_by_id = run_in_db_thread(database.get_post_by_id)
+get_post_validators = run_in_db_thread(database.get_post_validators)
+update_post = run_in_db_thread(database.update_post)
+delete_post = run_in_db_thread(database.delete_post)
+get_comments_by_post_id = run_in_db_thread(database.get_comments_by_post_id)
+get_comments_rows_by_post_id = run_in_db_thread(database.get_comments_rows_by_post_id)
+create_comment = run_in_db_thread(database.create_comment)
+create_comments_batch = run_in_db_thread(database.create_comments_batch)
+get_comment_by_id = run_in_db_thread(database.get_comment_by_id)
+update_comment = run_in_db_thread(database.update_comment)
+delete_comment = run_in_db_thread(database.delete_comment)
+add_like = run_in_db_thread(database.add_like)
+add_likes_batch = run_in_db_thread(database.add_likes_batch)
+get_likes_rows_by_username = run_in_db_thread(database.get_likes_rows_by_username)
+remove_like = run_in_db_thread(database.remove_like)
+check_post_counters = run_in_db_thread(database.check_post_counters)
+search_content = run_in_db_thread(database.search_content)
+refresh_trending_scores = run_in_db_thread(database.refresh_trending_scores)
+get_changes_since = run_in_db_thread(database.get_changes_since)
+prune_changes = run_in_db_thread(database.prune_changes)
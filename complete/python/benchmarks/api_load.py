@@ -0,0 +1,324 @@
+"""
+Mixed read/write load driver for every route in main.py.
+
+Requests are drawn from a weighted mix that resembles production traffic:
+mostly feed and post reads, skewed toward popular posts and active users,
+with a few percent of writes. Each request goes through the whole ASGI
+stack in-process, so the numbers include routing, validation and
+serialization but no network. Routes without a scenario are listed in the
+report, so new endpoints are not silently left out.
+
+Usage (from complete/python):
+    python -m benchmarks.api_load --posts 10000 --requests 5000 --concurrency 16
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.datagen import WORDS, describe, random_text, seed_database, zipf_weights
+from benchmarks.load_test import asgi_request
+from benchmarks.measure import environment, peak_rss_mb, summarize
+
+# method, path, query string, JSON body
+Request = Tuple[str, str, str, Optional[object]]
+
+# What browsers send; reads then pay for compression as they do in production
+READ_HEADERS = [(b"accept-encoding", b"gzip, deflate, br, zstd")]
+
+# Long-lived or privileged routes that do not belong in a throughput mix
+EXCLUDED_ROUTES = {"GET /api/stream"}
+EXCLUDED_PREFIXES = ("/api/admin", "/docs", "/redoc")
+
+
+class LoadState:
+    """The dataset plus the ids created during the run, shared by all workers."""
+
+    def __init__(self, dataset: dict, rng: random.Random):
+        self.rng = rng
+        self.post_ids = dataset["post_ids"]
+        self.usernames = dataset["usernames"]
+        self.post_weights = zipf_weights(len(self.post_ids), dataset["exponent"])
+        self.user_weights = zipf_weights(len(self.usernames), dataset["exponent"])
+        self.comments = list(dataset["comments"])
+        self.created_posts: List[Tuple[str, str]] = []
+        self.created_comments: List[Tuple[str, str, str]] = []
+        self.likes: List[Tuple[str, str]] = []
+        self.counter = itertools.count()
+
+    def hot_post(self) -> str:
+        return self.rng.choices(self.post_ids, cum_weights=self.post_weights)[0]
+
+    def active_user(self) -> str:
+        return self.rng.choices(self.usernames, cum_weights=self.user_weights)[0]
+
+    def fresh_username(self) -> str:
+        return f"loadfan{next(self.counter)}"
+
+    def pop(self, items: list):
+        return items.pop(self.rng.randrange(len(items))) if items else None
+
+
+def list_posts(state: LoadState) -> Request:
+    return "GET", "/api/posts", "limit=20", None
+
+
+def list_top_posts(state: LoadState) -> Request:
+    return "GET", "/api/posts", "limit=20&sort=top", None
+
+
+def list_trending_posts(state: LoadState) -> Request:
+    return "GET", "/api/posts", "limit=20&sort=trending", None
+
+
+def list_posts_by_user(state: LoadState) -> Request:
+    return "GET", "/api/posts", f"limit=20&username={state.active_user()}", None
+
+
+def get_post(state: LoadState) -> Request:
+    return "GET", f"/api/posts/{state.hot_post()}", "", None
+
+
+def list_comments(state: LoadState) -> Request:
+    return "GET", f"/api/posts/{state.hot_post()}/comments", "", None
+
+
+def get_comment(state: LoadState) -> Request:
+    post_id, comment_id = state.rng.choice(state.comments)
+    return "GET", f"/api/posts/{post_id}/comments/{comment_id}", "", None
+
+
+def user_posts(state: LoadState) -> Request:
+    return "GET", f"/api/users/{state.active_user()}/posts", "limit=20", None
+
+
+def user_likes(state: LoadState) -> Request:
+    return "GET", f"/api/users/{state.active_user()}/likes", "limit=20", None
+
+
+def search(state: LoadState) -> Request:
+    return "GET", "/api/search", f"q={state.rng.choice(WORDS)}&limit=20", None
+
+
+def changes(state: LoadState) -> Request:
+    return "GET", "/api/changes", "since=0&limit=100", None
+
+
+def export(state: LoadState) -> Request:
+    return "GET", "/api/posts/export", "", None
+
+
+def health(state: LoadState) -> Request:
+    return "GET", "/health", "", None
+
+
+def metrics(state: LoadState) -> Request:
+    return "GET", "/metrics", "", None
+
+
+def openapi(state: LoadState) -> Request:
+    return "GET", "/openapi.json", "", None
+
+
+def create_post(state: LoadState) -> Request:
+    return "POST", "/api/posts", "", {"username": state.active_user(), "content": random_text(state.rng, 5, 40)}
+
+
+def create_posts_batch(state: LoadState) -> Request:
+    body = [{"username": state.active_user(), "content": random_text(state.rng, 5, 40)} for _ in range(10)]
+    return "POST", "/api/posts:batch", "", body
+
+
+def update_post(state: LoadState) -> Optional[Request]:
+    if not state.created_posts:
+        return None
+    post_id, username = state.rng.choice(state.created_posts)
+    return "PATCH", f"/api/posts/{post_id}", "", {"username": username, "content": random_text(state.rng, 5, 40)}
+
+
+def delete_post(state: LoadState) -> Optional[Request]:
+    created = state.pop(state.created_posts)
+    return created and ("DELETE", f"/api/posts/{created[0]}", "", None)
+
+
+def create_comment(state: LoadState) -> Request:
+    body = {"username": state.active_user(), "content": random_text(state.rng, 2, 20)}
+    return "POST", f"/api/posts/{state.hot_post()}/comments", "", body
+
+
+def create_comments_batch(state: LoadState) -> Request:
+    body = [{"username": state.active_user(), "content": random_text(state.rng, 2, 20)} for _ in range(10)]
+    return "POST", f"/api/posts/{state.hot_post()}/comments:batch", "", body
+
+
+def update_comment(state: LoadState) -> Optional[Request]:
+    if not state.created_comments:
+        return None
+    post_id, comment_id, username = state.rng.choice(state.created_comments)
+    body = {"username": username, "content": random_text(state.rng, 2, 20)}
+    return "PATCH", f"/api/posts/{post_id}/comments/{comment_id}", "", body
+
+
+def delete_comment(state: LoadState) -> Optional[Request]:
+    created = state.pop(state.created_comments)
+    return created and ("DELETE", f"/api/posts/{created[0]}/comments/{created[1]}", "", None)
+
+
+def like(state: LoadState) -> Request:
+    return "POST", f"/api/posts/{state.hot_post()}/likes", "", {"username": state.fresh_username()}
+
+
+def like_batch(state: LoadState) -> Request:
+    body = [{"username": state.fresh_username()} for _ in range(10)]
+    return "POST", f"/api/posts/{state.hot_post()}/likes:batch", "", body
+
+
+def unlike(state: LoadState) -> Optional[Request]:
+    liked = state.pop(state.likes)
+    return liked and ("DELETE", f"/api/posts/{liked[0]}/likes", f"username={liked[1]}", None)
+
+
+# (route, weight, request builder); weights are percentages of all requests
+SCENARIOS: List[Tuple[str, float, Callable[[LoadState], Optional[Request]]]] = [
+    ("GET /api/posts", 16, list_posts),
+    ("GET /api/posts?sort=top", 3, list_top_posts),
+    ("GET /api/posts?sort=trending", 5, list_trending_posts),
+    ("GET /api/posts?username", 5, list_posts_by_user),
+    ("GET /api/posts/{post_id}", 25, get_post),
+    ("GET /api/posts/{post_id}/comments", 12, list_comments),
+    ("GET /api/posts/{post_id}/comments/{comment_id}", 3, get_comment),
+    ("GET /api/users/{username}/posts", 4, user_posts),
+    ("GET /api/users/{username}/likes", 3, user_likes),
+    ("GET /api/search", 4, search),
+    ("GET /api/changes", 1, changes),
+    ("GET /api/posts/export", 0.05, export),
+    ("GET /health", 0.5, health),
+    ("GET /metrics", 0.5, metrics),
+    ("GET /openapi.json", 0.45, openapi),
+    ("POST /api/posts", 2, create_post),
+    ("POST /api/posts:batch", 0.2, create_posts_batch),
+    ("PATCH /api/posts/{post_id}", 0.5, update_post),
+    ("DELETE /api/posts/{post_id}", 0.3, delete_post),
+    ("POST /api/posts/{post_id}/comments", 3, create_comment),
+    ("POST /api/posts/{post_id}/comments:batch", 0.2, create_comments_batch),
+    ("PATCH /api/posts/{post_id}/comments/{comment_id}", 0.5, update_comment),
+    ("DELETE /api/posts/{post_id}/comments/{comment_id}", 0.3, delete_comment),
+    ("POST /api/posts/{post_id}/likes", 4, like),
+    ("POST /api/posts/{post_id}/likes:batch", 0.3, like_batch),
+    ("DELETE /api/posts/{post_id}/likes", 1.7, unlike),
+]
+
+
+def record_created(state: LoadState, route: str, request: Request, status: int, body: bytes):
+    """Remember what a successful write created, so later updates and deletes have targets."""
+    if status >= 300:
+        return
+    if route == "POST /api/posts":
+        post = json.loads(body)
+        state.created_posts.append((post["id"], post["username"]))
+    elif route == "POST /api/posts/{post_id}/comments":
+        comment = json.loads(body)
+        state.created_comments.append((comment["postId"], comment["id"], comment["username"]))
+    elif route == "POST /api/posts/{post_id}/likes":
+        state.likes.append((request[1].split("/")[3], request[3]["username"]))
+
+
+def unexercised_routes(app) -> List[str]:
+    """Routes of the app that no scenario covers."""
+    covered = {route.split("?")[0] for route, _, _ in SCENARIOS}
+    missing = []
+    for route in app.routes:
+        path = getattr(route, "path", "")
+        for method in sorted(getattr(route, "methods", None) or ()):
+            name = f"{method} {path}"
+            if method == "HEAD" or name in covered or name in EXCLUDED_ROUTES or path.startswith(EXCLUDED_PREFIXES):
+                continue
+            missing.append(name)
+    return sorted(missing)
+
+
+async def run_load(app, dataset: dict, total: int, concurrency: int, seed: int = 42) -> dict:
+    """Issue `total` requests from the weighted mix with `concurrency` in flight."""
+    rng = random.Random(seed)
+    state = LoadState(dataset, rng)
+    routes = [route for route, _, _ in SCENARIOS]
+    builders = {route: builder for route, _, builder in SCENARIOS}
+    cum_weights = list(itertools.accumulate(weight for _, weight, _ in SCENARIOS))
+
+    latencies: Dict[str, List[float]] = {route: [] for route in routes}
+    statuses: Dict[str, Dict[str, int]] = {route: {} for route in routes}
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            route = rng.choices(routes, cum_weights=cum_weights)[0]
+            request = builders[route](state)
+            if request is None:
+                # Nothing to update or delete yet; read a post instead
+                route, request = "GET /api/posts/{post_id}", get_post(state)
+            method, path, query, body = request
+            started = time.perf_counter()
+            # Writes stay uncompressed so record_created() can parse what they created
+            headers = READ_HEADERS if method == "GET" else None
+            status, content = await asgi_request(app, method, path, query, body, headers)
+            latencies[route].append(time.perf_counter() - started)
+            statuses[route][str(status)] = statuses[route].get(str(status), 0) + 1
+            record_created(state, route, request, status, content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    server_errors = sum(
+        count for codes in statuses.values() for code, count in codes.items() if code.startswith("5")
+    )
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "overall": summarize(all_latencies, elapsed),
+        "server_errors": server_errors,
+        "routes": {
+            route: {**summarize(values), "statuses": statuses[route]}
+            for route, values in latencies.items() if values
+        },
+        "unexercised_routes": unexercised_routes(app),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    import database
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(), "api_load.db")
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        dataset = seed_database(args.posts, seed=args.seed)
+        return {
+            "environment": environment(),
+            "dataset": describe(dataset),
+            "load": await run_load(app, dataset, args.requests, args.concurrency, args.seed),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write load against every SNS API route")
+    parser.add_argument("--posts", type=int, default=10000, help="Number of posts to seed")
+    parser.add_argument("--requests", type=int, default=5000, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
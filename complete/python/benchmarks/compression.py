@@ -0,0 +1,75 @@
+"""
+Compression benchmark: size and CPU cost of each available encoding.
+
+Seeds a scratch database, then compresses typical response bodies (feed
+pages of 20 and 100 posts and the comments of the most commented post)
+with every encoding this process offers, at the configured level and at the
+level used for pre-compressed documents. Use it to pick
+SNS_COMPRESSION_MIN_SIZE and the per-encoding levels.
+
+Usage (from complete/python):
+    python -m benchmarks.compression --posts 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict
+
+
+def sample_bodies(dataset: dict) -> Dict[str, bytes]:
+    from database import get_all_posts_rows, get_comments_rows_by_post_id
+    from fast_json import dumps
+
+    return {
+        "feed_page_20": dumps(get_all_posts_rows(limit=20)[0]),
+        "feed_page_100": dumps(get_all_posts_rows(limit=100)[0]),
+        "comments_of_top_post": dumps(get_comments_rows_by_post_id(dataset["post_ids"][0])),
+    }
+
+
+def measure(body: bytes, encoding: str, best: bool, repeat: int) -> dict:
+    """Best-of-`repeat` compression time and the compressed size."""
+    from compression import compress
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressed = compress(body, encoding, best=best)
+        timings.append(time.perf_counter() - started)
+    return {
+        "bytes": len(body),
+        "compressed_bytes": len(compressed),
+        "ratio": round(len(compressed) / len(body), 3),
+        "microseconds": round(min(timings) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response compression encodings and levels")
+    parser.add_argument("--posts", type=int, default=10000, help="Number of posts to seed")
+    parser.add_argument("--repeat", type=int, default=50, help="Compressions per measurement")
+    args = parser.parse_args()
+
+    import database
+    from benchmarks.datagen import seed_database
+    from compression import AVAILABLE_ENCODINGS
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(), "compression.db")
+    database.init_database()
+    dataset = seed_database(args.posts)
+    for name, body in sample_bodies(dataset).items():
+        for encoding in AVAILABLE_ENCODINGS:
+            for best in (False, True):
+                print(json.dumps({
+                    "body": name,
+                    "encoding": encoding,
+                    "level": "document" if best else "response",
+                    **measure(body, encoding, best, args.repeat),
+                }))
+    database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
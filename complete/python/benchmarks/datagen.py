@@ -0,0 +1,173 @@
+"""
+Synthetic data generator for benchmarks.
+
+Seeds posts whose likes and comments follow a Zipfian distribution: a few
+posts collect most of the engagement and most posts get little or none, and
+a few users write most of the posts and comments. The same seed always
+produces the same data, so runs can be compared.
+
+Usage (from complete/python):
+    python -m benchmarks.datagen --posts 10000 --database sns_api.db
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List
+
+WORDS = (
+    "coffee morning weekend travel music concert garden recipe python sqlite "
+    "release deploy sunset beach mountain hiking photo puppy kitten movie "
+    "book review launch team update happy great new today finally"
+).split()
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative weights of ranks 1..count under a Zipf law, for random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def random_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def random_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def timestamp(moment: datetime) -> str:
+    return moment.isoformat() + "Z"
+
+
+def seed_database(
+    posts: int,
+    users: int = 1000,
+    likes_per_post: float = 10,
+    comments_per_post: float = 3,
+    exponent: float = 1.1,
+    days: float = 30,
+    seed: int = 42,
+) -> dict:
+    """Bulk insert a Zipfian dataset into the current database and describe it.
+
+    Rows are inserted directly, so the counter, search and change triggers
+    run exactly as they do for writes through database.py; trending scores
+    and the hot set, which database.py maintains itself, are rebuilt
+    afterwards. The returned
+    `post_ids` are ordered by popularity, most liked first, so callers can
+    draw hot posts with zipf_weights() as well.
+    """
+    from database import get_db_connection, load_hot_set, rebuild_trending_scores
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    usernames = [f"user{i}" for i in range(users)]
+    user_weights = zipf_weights(users, exponent)
+    post_weights = zipf_weights(posts, exponent)
+
+    post_rows = []
+    for _ in range(posts):
+        created_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        post_rows.append((
+            random_id(rng),
+            rng.choices(usernames, cum_weights=user_weights)[0],
+            random_text(rng, 5, 40),
+            created_at,
+        ))
+    # Popularity is independent of age: shuffle which post gets which rank
+    ranked = post_rows[:]
+    rng.shuffle(ranked)
+
+    like_counts = Counter(rng.choices(range(posts), cum_weights=post_weights, k=int(posts * likes_per_post)))
+    comment_counts = Counter(rng.choices(range(posts), cum_weights=post_weights, k=int(posts * comments_per_post)))
+
+    like_rows = []
+    comment_rows = []
+    for rank, (post_id, _, _, created_at) in enumerate(ranked):
+        age = (now - created_at).total_seconds()
+        for username in rng.sample(usernames, min(like_counts[rank], users)):
+            liked_at = created_at + timedelta(seconds=rng.uniform(0, age))
+            like_rows.append((post_id, username, timestamp(liked_at)))
+        for _ in range(comment_counts[rank]):
+            commented_at = timestamp(created_at + timedelta(seconds=rng.uniform(0, age)))
+            comment_rows.append((
+                random_id(rng),
+                post_id,
+                rng.choices(usernames, cum_weights=user_weights)[0],
+                random_text(rng, 2, 20),
+                commented_at,
+                commented_at,
+            ))
+
+    with get_db_connection() as conn:
+        conn.executemany("""
+            INSERT INTO posts (id, username, content, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(post_id, username, content, timestamp(created_at), timestamp(created_at))
+              for post_id, username, content, created_at in post_rows])
+        conn.executemany("""
+            INSERT INTO comments (id, post_id, username, content, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, comment_rows)
+        conn.executemany("INSERT INTO likes (post_id, username, liked_at) VALUES (?, ?, ?)", like_rows)
+        conn.commit()
+    rebuild_trending_scores()
+    load_hot_set()
+
+    return {
+        "post_ids": [row[0] for row in ranked],
+        "usernames": usernames,
+        "comments": [(row[1], row[0]) for row in comment_rows],
+        "likes": [(row[0], row[1]) for row in like_rows],
+        "exponent": exponent,
+        "seed": seed,
+    }
+
+
+def describe(dataset: dict) -> dict:
+    """Sizes of a seeded dataset, for reports."""
+    likes = Counter(post_id for post_id, _ in dataset["likes"])
+    return {
+        "posts": len(dataset["post_ids"]),
+        "users": len(dataset["usernames"]),
+        "comments": len(dataset["comments"]),
+        "likes": len(dataset["likes"]),
+        "max_likes_per_post": max(likes.values(), default=0),
+        "posts_without_likes": len(dataset["post_ids"]) - len(likes),
+        "exponent": dataset["exponent"],
+        "seed": dataset["seed"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed an SNS API database with Zipfian synthetic data")
+    parser.add_argument("--posts", type=int, default=10000, help="Number of posts to seed")
+    parser.add_argument("--users", type=int, default=1000, help="Number of distinct users")
+    parser.add_argument("--likes-per-post", type=float, default=10, help="Average likes per post")
+    parser.add_argument("--comments-per-post", type=float, default=3, help="Average comments per post")
+    parser.add_argument("--exponent", type=float, default=1.1, help="Zipf exponent; higher is more skewed")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--database", help="SQLite file to seed (defaults to the app's database)")
+    args = parser.parse_args()
+
+    import database
+    if args.database:
+        database.DATABASE_NAME = args.database
+    database.init_database()
+
+    started = time.perf_counter()
+    dataset = seed_database(
+        args.posts, args.users, args.likes_per_post, args.comments_per_post, args.exponent, seed=args.seed
+    )
+    summary = describe(dataset)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(summary))
+    database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
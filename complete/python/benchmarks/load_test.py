@@ -0,0 +1,132 @@
+"""
+Concurrency load test for the SNS API.
+
+Drives the FastAPI app in-process over ASGI at increasing concurrency levels
+and reports throughput, to check that requests scale with concurrency instead
+of serializing behind blocking database calls.
+
+Usage (from complete/python):
+    python -m benchmarks.load_test --posts 5000 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+
+async def asgi_request(
+    app, method: str, path: str, query: str = "", body: Optional[dict] = None,
+    headers: Optional[List[Tuple[bytes, bytes]]] = None
+) -> Tuple[int, bytes]:
+    """Send a single HTTP request to an ASGI app and collect the (possibly compressed) response body."""
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"),
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json")] + (headers or []),
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    request_sent = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def seed_database(count: int) -> List[str]:
+    """Insert `count` posts with a few likes each and return their ids."""
+    from database import create_post, add_like
+    from models import NewPostRequest
+
+    post_ids = []
+    for i in range(count):
+        post = create_post(NewPostRequest(username=f"user{i % 100}", content=f"Benchmark post {i}"))
+        for j in range(i % 5):
+            add_like(post.id, f"fan{j}")
+        post_ids.append(post.id)
+    return post_ids
+
+
+async def run_level(app, post_ids: List[str], concurrency: int, total: int) -> dict:
+    """Issue `total` read requests with `concurrency` in flight and measure throughput."""
+    remaining = total
+    errors = 0
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            if random.random() < 0.5:
+                status, _ = await asgi_request(app, "GET", "/api/posts", "limit=50")
+            else:
+                status, _ = await asgi_request(app, "GET", f"/api/posts/{random.choice(post_ids)}")
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> List[dict]:
+    import database
+    database.DATABASE_NAME = args.database or os.path.join(tempfile.mkdtemp(), "benchmark.db")
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        post_ids = seed_database(args.posts)
+        results = []
+        for concurrency in args.concurrency:
+            results.append(await run_level(app, post_ids, concurrency, args.requests))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SNS API concurrency load test")
+    parser.add_argument("--posts", type=int, default=2000, help="Number of posts to seed")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--database", help="SQLite file to use (defaults to a temporary file)")
+    args = parser.parse_args()
+
+    for result in asyncio.run(main_async(args)):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Latency summaries, peak memory and baseline comparison for benchmark reports.
+"""
+import platform
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Differences smaller than this are timer noise, whatever the ratio
+MIN_REGRESSION_MS = 0.05
+
+# A percentile is only compared when enough samples back it; a p99 of 50 calls is one outlier
+MIN_SAMPLES = {"p50_ms": 10, "p95_ms": 100, "p99_ms": 1000}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], elapsed: Optional[float] = None) -> dict:
+    """p50/p95/p99/mean/max in milliseconds, plus throughput when the wall time is known."""
+    values = sorted(latencies)
+    total = elapsed if elapsed is not None else sum(values)
+    summary = {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 4),
+        "mean_ms": round(sum(values) / len(values) * 1000, 4) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 4) if values else 0.0,
+    }
+    summary["per_second"] = round(len(values) / total, 1) if total else 0.0
+    return summary
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def environment() -> dict:
+    """Where a report was produced; only comparable reports should be compared."""
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare_latency(name: str, baseline: dict, current: dict, tolerance: float) -> List[str]:
+    regressions = []
+    samples = min(baseline.get("count", 0), current.get("count", 0))
+    for key, min_samples in MIN_SAMPLES.items():
+        before, after = baseline.get(key), current.get(key)
+        if before is None or after is None or samples < min_samples:
+            continue
+        if after > before * (1 + tolerance) and after - before > MIN_REGRESSION_MS:
+            regressions.append(f"{name} {key}: {before} -> {after}")
+    return regressions
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Describe every latency, throughput or peak memory regression beyond `tolerance` (0.2 = 20%)."""
+    regressions: List[str] = []
+
+    def sections(report: dict) -> Dict[str, dict]:
+        found = {f"micro {name}": result for name, result in report.get("micro", {}).get("results", {}).items()}
+        load = report.get("load", {})
+        if "overall" in load:
+            found["load overall"] = load["overall"]
+        found.update({f"load {route}": result for route, result in load.get("routes", {}).items()})
+        return found
+
+    before_sections = sections(baseline)
+    for name, after in sections(current).items():
+        before = before_sections.get(name)
+        if before is None:
+            continue
+        regressions.extend(compare_latency(name, before, after, tolerance))
+
+    before_throughput = baseline.get("load", {}).get("overall", {}).get("per_second")
+    after_throughput = current.get("load", {}).get("overall", {}).get("per_second")
+    if before_throughput and after_throughput and after_throughput < before_throughput * (1 - tolerance):
+        regressions.append(f"load throughput: {before_throughput} -> {after_throughput} requests/s")
+
+    before_rss, after_rss = baseline.get("peak_rss_mb"), current.get("peak_rss_mb")
+    if before_rss and after_rss and after_rss > before_rss * (1 + tolerance):
+        regressions.append(f"peak RSS: {before_rss} -> {after_rss} MB")
+    return regressions
@@ -0,0 +1,218 @@
+"""
+Micro-benchmarks for the functions in database.py.
+
+Each benchmark calls one database.py function directly, without HTTP or the
+thread pool, against a Zipfian dataset from benchmarks.datagen. Arguments
+are prepared by an untimed setup step, so a benchmark of delete_comment()
+only times the delete. Public database.py functions without a benchmark are
+listed in the report, so new ones are not silently left out.
+
+Usage (from complete/python):
+    python -m benchmarks.micro --posts 10000 --iterations 200
+"""
+import argparse
+import inspect
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.datagen import WORDS, describe, random_text, seed_database, zipf_weights
+from benchmarks.measure import environment, peak_rss_mb, summarize
+
+# Setup (untimed, returns the arguments) and the timed call
+Benchmark = Tuple[Optional[Callable[[], tuple]], Callable]
+
+# Heavy benchmarks run this many times fewer iterations
+HEAVY = {
+    "iter_posts_for_export": 50, "check_post_counters": 50, "rebuild_search_index": 100,
+    "rebuild_trending_scores": 100, "refresh_trending_scores": 10,
+}
+
+# Lifecycle, plumbing and stats helpers that are not worth timing on their own
+NOT_BENCHMARKED = {
+    "init_database", "get_pool", "close_pool", "get_write_queue", "close_write_queue",
+    "get_write_queue_stats", "add_change_listener", "remove_change_listener", "notify_change",
+    "get_process_origin", "apply_remote_change", "start_change_watcher", "stop_change_watcher",
+    "get_change_watcher_stats", "get_pool_stats", "get_cache_stats", "is_foreign_key_violation",
+    "get_db_connection", "tag_origin", "run_write", "load_hot_set", "refresh_hot_set", "get_hot_set_stats",
+    "get_latest_change_seq",
+}
+
+WARMUP_ITERATIONS = 5
+
+
+def build_benchmarks(dataset: dict, rng: random.Random) -> Dict[str, Benchmark]:
+    """One or more benchmarks per database.py function, keyed `function` or `function[variant]`."""
+    import database
+    from models import NewCommentRequest, NewPostRequest, UpdateCommentRequest, UpdatePostRequest
+
+    post_ids = dataset["post_ids"]
+    usernames = dataset["usernames"]
+    post_weights = zipf_weights(len(post_ids), dataset["exponent"])
+    user_weights = zipf_weights(len(usernames), dataset["exponent"])
+    comments = dataset["comments"]
+    counter = itertools.count()
+
+    def hot_post() -> str:
+        return rng.choices(post_ids, cum_weights=post_weights)[0]
+
+    def active_user() -> str:
+        return rng.choices(usernames, cum_weights=user_weights)[0]
+
+    def new_post() -> NewPostRequest:
+        return NewPostRequest(username=active_user(), content=random_text(rng, 5, 40))
+
+    def new_comment() -> NewCommentRequest:
+        return NewCommentRequest(username=active_user(), content=random_text(rng, 2, 20))
+
+    def fresh_username() -> str:
+        return f"bench{next(counter)}"
+
+    def created_post() -> str:
+        return database.create_post(new_post()).id
+
+    def created_comment(post_id: str) -> str:
+        return database.create_comment(post_id, new_comment()).id
+
+    def uncached_post() -> tuple:
+        post_id = hot_post()
+        database.post_cache.invalidate(post_id)
+        return (post_id,)
+
+    def owned_post() -> tuple:
+        post_id = created_post()
+        post = database.get_post_by_id(post_id)
+        return post_id, UpdatePostRequest(username=post.username, content=random_text(rng, 5, 40))
+
+    def owned_comment() -> tuple:
+        post_id = hot_post()
+        comment = database.create_comment(post_id, new_comment())
+        return post_id, comment.id, UpdateCommentRequest(username=comment.username, content=random_text(rng, 2, 20))
+
+    def comment_to_delete() -> tuple:
+        post_id = hot_post()
+        return post_id, created_comment(post_id)
+
+    def liked_post() -> tuple:
+        post_id, username = hot_post(), fresh_username()
+        database.add_like(post_id, username)
+        return post_id, username
+
+    _, deep_cursor = database.get_all_posts_rows(limit=min(1000, len(post_ids)))
+    _, top_cursor = database.get_all_posts_rows(limit=min(1000, len(post_ids)), sort="top")
+    with database.get_db_connection() as conn:
+        recent_seq = max(0, database.get_latest_change_seq(conn) - 100)
+
+    return {
+        # Reads
+        "get_all_posts": (None, lambda: database.get_all_posts(limit=20)),
+        "get_all_posts_rows": (None, lambda: database.get_all_posts_rows(limit=20)),
+        "get_all_posts_rows[deep_cursor]": (None, lambda: database.get_all_posts_rows(limit=20, cursor=deep_cursor)),
+        "get_all_posts_rows[top]": (None, lambda: database.get_all_posts_rows(limit=20, sort="top")),
+        "get_all_posts_rows[top_deep_cursor]": (None, lambda: database.get_all_posts_rows(limit=20, cursor=top_cursor, sort="top")),
+        "get_all_posts_rows[trending]": (None, lambda: database.get_all_posts_rows(limit=20, sort="trending")),
+        "get_all_posts_rows[username]": (lambda: (active_user(),), lambda username: database.get_all_posts_rows(limit=20, username=username)),
+        "get_post_by_id": (lambda: (hot_post(),), database.get_post_by_id),
+        "get_post_by_id[uncached]": (uncached_post, database.get_post_by_id),
+        "get_post_validators": (lambda: (hot_post(),), database.get_post_validators),
+        "get_comments_by_post_id": (lambda: (hot_post(),), database.get_comments_by_post_id),
+        "get_comments_rows_by_post_id": (lambda: (hot_post(),), database.get_comments_rows_by_post_id),
+        "get_comments_rows_by_post_ids": (lambda: ([hot_post() for _ in range(20)],), database.get_comments_rows_by_post_ids),
+        "get_comment_by_id": (lambda: rng.choice(comments), database.get_comment_by_id),
+        "get_likes_rows_by_post_ids": (lambda: ([hot_post() for _ in range(20)],), database.get_likes_rows_by_post_ids),
+        "get_likes_rows_by_username": (lambda: (active_user(),), lambda username: database.get_likes_rows_by_username(username, limit=20)),
+        "build_match_query": (lambda: (random_text(rng, 1, 3),), database.build_match_query),
+        "search_content": (lambda: (rng.choice(WORDS),), lambda query: database.search_content(query, limit=20)),
+        "get_changes_since": (None, lambda: database.get_changes_since(recent_seq, limit=100)),
+        "iter_posts_for_export": (None, lambda: sum(len(batch) for batch in database.iter_posts_for_export())),
+        "check_post_counters": (None, database.check_post_counters),
+        "rebuild_search_index": (None, database.rebuild_search_index),
+        "refresh_trending_scores": (None, database.refresh_trending_scores),
+        "rebuild_trending_scores": (None, database.rebuild_trending_scores),
+        "prune_changes": (None, database.prune_changes),
+        # Writes
+        "create_post": (lambda: (new_post(),), database.create_post),
+        "create_posts_batch": (lambda: ([new_post() for _ in range(10)],), database.create_posts_batch),
+        "update_post": (owned_post, database.update_post),
+        "delete_post": (lambda: (created_post(),), database.delete_post),
+        "create_comment": (lambda: (hot_post(), new_comment()), database.create_comment),
+        "create_comments_batch": (lambda: (hot_post(), [new_comment() for _ in range(10)]), database.create_comments_batch),
+        "update_comment": (owned_comment, database.update_comment),
+        "delete_comment": (comment_to_delete, database.delete_comment),
+        "add_like": (lambda: (hot_post(), fresh_username()), database.add_like),
+        "add_likes_batch": (lambda: (hot_post(), [fresh_username() for _ in range(10)]), database.add_likes_batch),
+        "remove_like": (liked_post, database.remove_like),
+    }
+
+
+def uncovered_functions(benchmarks: Dict[str, Benchmark]) -> List[str]:
+    """Public database.py functions with neither a benchmark nor an exemption."""
+    import database
+
+    covered = {name.split("[")[0] for name in benchmarks}
+    return sorted(
+        name for name, func in inspect.getmembers(database, inspect.isfunction)
+        if func.__module__ == "database" and not name.startswith("_")
+        and name not in covered and name not in NOT_BENCHMARKED
+    )
+
+
+def run_benchmark(benchmark: Benchmark, iterations: int) -> dict:
+    setup, func = benchmark
+    for _ in range(min(WARMUP_ITERATIONS, iterations)):
+        func(*(setup() if setup else ()))
+    latencies = []
+    for _ in range(iterations):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def run_micro(dataset: dict, iterations: int, seed: int = 42, only: Optional[List[str]] = None) -> dict:
+    """Run every benchmark (or those named in `only`) and summarize each one."""
+    rng = random.Random(seed)
+    benchmarks = build_benchmarks(dataset, rng)
+    results = {}
+    for name, benchmark in benchmarks.items():
+        if only and name.split("[")[0] not in only and name not in only:
+            continue
+        count = max(1, iterations // HEAVY.get(name, 1))
+        results[name] = run_benchmark(benchmark, count)
+    return {
+        "iterations": iterations,
+        "results": results,
+        "uncovered": uncovered_functions(benchmarks),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for database.py")
+    parser.add_argument("--posts", type=int, default=10000, help="Number of posts to seed")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per benchmark")
+    parser.add_argument("--only", nargs="+", help="Only run benchmarks of these functions")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    import database
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(), "micro.db")
+    database.init_database()
+    dataset = seed_database(args.posts, seed=args.seed)
+    report = {
+        "environment": environment(),
+        "dataset": describe(dataset),
+        "micro": run_micro(dataset, args.iterations, args.seed, args.only),
+    }
+    database.close_write_queue()
+    database.close_pool()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
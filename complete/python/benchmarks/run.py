@@ -0,0 +1,86 @@
+"""
+Full benchmark run: seed, micro-benchmarks, then mixed API load.
+
+Writes one JSON report with p50/p95/p99 latencies per database.py function
+and per route, overall throughput and peak RSS. Given a previous report as
+--baseline, it lists regressions beyond --tolerance and exits with status 1,
+so it can gate a change in CI. Compare only reports produced on the same
+machine with the same arguments.
+
+Usage (from complete/python):
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --baseline before.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.api_load import run_load
+from benchmarks.datagen import describe, seed_database
+from benchmarks.measure import compare, environment, peak_rss_mb
+from benchmarks.micro import run_micro
+
+
+async def run_all(args: argparse.Namespace) -> dict:
+    import database
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        dataset = seed_database(args.posts, seed=args.seed)
+        seeded = time.perf_counter() - started
+        micro = run_micro(dataset, args.iterations, args.seed)
+        load = await run_load(app, dataset, args.requests, args.concurrency, args.seed)
+
+    return {
+        "environment": environment(),
+        "arguments": dict(vars(args)),
+        "dataset": {**describe(dataset), "seconds": round(seeded, 3)},
+        "micro": micro,
+        "load": load,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SNS API benchmark suite")
+    parser.add_argument("--posts", type=int, default=10000, help="Number of posts to seed")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests in the load phase")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight in the load phase")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and request mix")
+    parser.add_argument("--output", help="Write the report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a regression, as a fraction")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_all(args))
+    # Keep comparison settings out of the report so reruns with a baseline stay comparable
+    for key in ("output", "baseline", "tolerance"):
+        report["arguments"].pop(key)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Serialization benchmark: Pydantic response models vs. the fast JSON path.
+
+Seeds a scratch database with N posts and compares, for each N, the latency
+and peak Python memory of
+
+- models: get_all_posts() building Post models, then the same dump/validate/
+  serialize/json.dumps round trip FastAPI runs for response_model=List[Post]
+- fast:   get_all_posts_rows() encoded directly by fast_json.dumps()
+
+Usage (from complete/python):
+    python -m benchmarks.serialization --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+
+def seed_posts(count: int):
+    """Bulk insert `count` posts straight into the posts table."""
+    from database import get_db_connection
+
+    started = datetime(2025, 1, 1)
+    rows = [
+        (
+            str(uuid.uuid4()),
+            f"user{i % 1000}",
+            f"Benchmark post number {i} with a little bit of text to make it realistic.",
+            (started + timedelta(seconds=i)).isoformat() + "Z",
+            (started + timedelta(seconds=i)).isoformat() + "Z",
+            i % 50,
+            i % 7,
+        )
+        for i in range(count)
+    ]
+    with get_db_connection() as conn:
+        conn.executemany("""
+            INSERT INTO posts (id, username, content, created_at, updated_at, likes_count, comments_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+
+def models_path(limit: int) -> bytes:
+    from database import get_all_posts
+    from models import Post
+
+    adapter = TypeAdapter(List[Post])
+    posts, _ = get_all_posts(limit=limit)
+    validated = adapter.validate_python([post.model_dump() for post in posts])
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(limit: int) -> bytes:
+    from database import get_all_posts_rows
+    from fast_json import dumps
+
+    rows, _ = get_all_posts_rows(limit=limit)
+    return dumps(rows)
+
+
+def measure(func: Callable[[int], bytes], limit: int, repeat: int) -> dict:
+    """Best-of-`repeat` latency, then a separate traced run for peak memory."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(limit)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(min(timings), 4),
+        "peak_memory_mb": round(peak / 1024 / 1024, 1),
+        "body_bytes": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Pydantic and fast JSON serialization of the posts list")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import database
+
+    for size in args.sizes:
+        database.close_pool()
+        database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(), "serialization.db")
+        database.init_database()
+        seed_posts(size)
+        for name, func in (("models", models_path), ("fast", fast_path)):
+            print(json.dumps({"posts": size, "path": name, **measure(func, size, args.repeat)}))
+    database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
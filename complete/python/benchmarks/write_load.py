@@ -0,0 +1,93 @@
+"""
+Concurrent write benchmark for the SNS API.
+
+Hammers add_like/remove_like from many threads, once committing each write
+on its own and once through the group-commit write queue, and reports
+throughput, latency and "database is locked" failures for both.
+
+Usage (from complete/python):
+    python -m benchmarks.write_load --threads 32 --operations 200
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import List
+
+
+def run_mode(use_queue: bool, threads: int, operations: int, posts: int) -> dict:
+    """Run `operations` like/unlike calls per thread against a fresh database."""
+    import database
+    from models import NewPostRequest
+
+    database.DATABASE_NAME = os.path.join(tempfile.mkdtemp(), "write_load.db")
+    database.WRITE_QUEUE_ENABLED = use_queue
+    database.init_database()
+    post_ids = [
+        database.create_post(NewPostRequest(username="author", content=f"Post {i}")).id
+        for i in range(posts)
+    ]
+
+    latencies: List[float] = []
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+
+    def worker(index: int):
+        username = f"fan{index}"
+        local = []
+        for i in range(operations):
+            post_id = post_ids[(index + i) % len(post_ids)]
+            started = time.perf_counter()
+            try:
+                if database.add_like(post_id, username) is None:
+                    database.remove_like(post_id, username)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors["locked" if "locked" in str(e) else "other"] += 1
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    queue_stats = database.get_write_queue_stats()
+    database.close_write_queue()
+    database.close_pool()
+
+    latencies.sort()
+    total = threads * operations
+    return {
+        "mode": "group_commit" if use_queue else "per_call_commit",
+        "threads": threads,
+        "operations": total,
+        "seconds": round(elapsed, 3),
+        "operations_per_second": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "errors": errors,
+        "average_batch": queue_stats["average_batch"] if queue_stats else 1,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SNS API concurrent write benchmark")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent writer threads")
+    parser.add_argument("--operations", type=int, default=200, help="Like/unlike calls per thread")
+    parser.add_argument("--posts", type=int, default=50, help="Number of posts to spread likes over")
+    args = parser.parse_args()
+
+    for use_queue in (False, True):
+        print(json.dumps(run_mode(use_queue, args.threads, args.operations, args.posts)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Bounded in-process LRU cache with per-entry time-to-live.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    A `max_size` of 0 disables the cache. Readers that load a value from the
+    database should take `generation()` before the query and store the result
+    with `set(..., generation=...)`, so a value read before a concurrent
+    invalidation is never written back over it.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def generation(self) -> int:
+        """Return a token that changes whenever an entry is invalidated."""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """Store a value, evicting the least recently used entry when full.
+
+        If `generation` is given and an invalidation happened since it was taken,
+        the value may be stale and is not stored.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Snapshot of cache size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                **self._stats,
+            }
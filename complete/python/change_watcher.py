@@ -0,0 +1,108 @@
+"""
+Cross-process change notifications for multi-worker deployments.
+
+Triggers record every write in the changes table. A ChangeWatcher runs one
+background thread per worker process that polls `PRAGMA data_version`, which
+only changes when another connection has committed, and reads the new rows
+of the changes table when it does. Each worker can then invalidate its
+caches and publish live events for writes made by the other workers, using
+nothing but the shared SQLite file.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+from db_pool import connect
+
+
+CHANGE_WATCH_ENABLED = os.environ.get("SNS_WATCH_CHANGES", "").lower() in ("1", "true", "yes")
+CHANGE_POLL_INTERVAL_MS = float(os.environ.get("SNS_CHANGE_POLL_INTERVAL_MS", "100"))
+CHANGE_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+# Called with (seq, event_type, post_id, data, origin) for each new change row
+ChangeHandler = Callable[[int, str, str, dict, Optional[str]], None]
+
+
+class ChangeWatcher:
+    """Background thread that reports rows appended to the changes table by any process."""
+
+    def __init__(
+        self, database: str, on_change: ChangeHandler, interval: float = CHANGE_POLL_INTERVAL_MS / 1000,
+        since: Optional[int] = None
+    ):
+        """Report changes after sequence number `since`, or only those committed from now on."""
+        self.database = database
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._conn = connect(database)
+        # Without a starting point, wait for the next commit; with one, catch up on the first poll
+        self._data_version = self._read_data_version() if since is None else None
+        self._last_seq = self._read_last_seq() if since is None else since
+        self._stats = {"polls": 0, "wakeups": 0, "changes": 0, "handler_errors": 0}
+        self._thread = threading.Thread(target=self._run, name="sns-change-watcher", daemon=True)
+        self._thread.start()
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _read_last_seq(self) -> int:
+        return self._conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                self.poll()
+        finally:
+            self._conn.close()
+
+    def poll(self):
+        """Deliver changes committed since the last poll; cheap when nothing changed."""
+        data_version = self._read_data_version()
+        with self._lock:
+            self._stats["polls"] += 1
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        with self._lock:
+            self._stats["wakeups"] += 1
+
+        while True:
+            rows = self._conn.execute("""
+                SELECT seq, event, post_id, data, origin
+                FROM changes
+                WHERE seq > ?
+                ORDER BY seq
+                LIMIT ?
+            """, (self._last_seq, CHANGE_BATCH_SIZE)).fetchall()
+            for row in rows:
+                self._last_seq = row["seq"]
+                try:
+                    self.on_change(row["seq"], row["event"], row["post_id"], json.loads(row["data"]), row["origin"])
+                except Exception:
+                    logger.exception("Change handler failed for change %s", row["seq"])
+                    with self._lock:
+                        self._stats["handler_errors"] += 1
+            with self._lock:
+                self._stats["changes"] += len(rows)
+            if len(rows) < CHANGE_BATCH_SIZE:
+                return
+
+    def stats(self) -> dict:
+        """Snapshot of polling counters for monitoring."""
+        with self._lock:
+            return {
+                "interval_ms": self.interval * 1000,
+                "last_seq": self._last_seq,
+                **self._stats,
+            }
+
+    def close(self):
+        """Stop polling and close the watcher's connection."""
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,254 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware compresses JSON and text responses of at least
+SNS_COMPRESSION_MIN_SIZE bytes with the best encoding the client accepts:
+zstd, br or gzip, preferred in the order of SNS_COMPRESSION_ENCODINGS when
+the client accepts several equally. Smaller bodies are sent as they are,
+since compressing them saves less than it costs. Streaming responses (the
+/api/stream Server-Sent Events and the NDJSON export) pass through
+untouched, as do responses that already carry a Content-Encoding, such as
+documents pre-compressed by http_cache.build_document().
+
+Compressed bodies of successful GET responses are cached by a digest of
+the uncompressed body, so a feed page served again unchanged is not
+compressed again. Strong ETags get a per-encoding suffix, because the
+compressed bytes differ from the identity bytes.
+
+br and zstd need the optional `brotli` and `zstandard` packages; without
+them only gzip is offered.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_MIN_SIZE = int(os.environ.get("SNS_COMPRESSION_MIN_SIZE", "1024"))
+# Server preference among encodings the client accepts equally; empty disables compression
+COMPRESSION_ENCODINGS = [
+    name.strip() for name in os.environ.get("SNS_COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if name.strip()
+]
+GZIP_LEVEL = int(os.environ.get("SNS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("SNS_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.environ.get("SNS_ZSTD_LEVEL", "3"))
+COMPRESSION_CACHE_SIZE = int(os.environ.get("SNS_COMPRESSION_CACHE_SIZE", "256"))
+COMPRESSION_CACHE_TTL = 300
+# Bodies this large are compressed on a worker thread so the event loop keeps serving; every codec releases the GIL
+THREADED_MIN_SIZE = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+# Buffering these to compress them would hold back every event until the stream ends
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def gzip_compress(body: bytes, level: int) -> bytes:
+    # A fixed mtime keeps the output, and so its strong ETag, identical across runs
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def brotli_compress(body: bytes, level: int) -> bytes:
+    return brotli.compress(body, quality=level)
+
+
+def zstd_compress(body: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+# encoding -> (compress, level per response, level for documents compressed once)
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes, int], bytes], int, int]] = {"gzip": (gzip_compress, GZIP_LEVEL, 9)}
+if brotli is not None:
+    COMPRESSORS["br"] = (brotli_compress, BROTLI_QUALITY, 11)
+if zstandard is not None:
+    COMPRESSORS["zstd"] = (zstd_compress, ZSTD_LEVEL, 19)
+
+# Encodings this process offers, most preferred first
+AVAILABLE_ENCODINGS = [name for name in COMPRESSION_ENCODINGS if name in COMPRESSORS]
+
+# Compressed bodies keyed by (digest of the uncompressed body, encoding)
+response_cache = TTLCache(COMPRESSION_CACHE_SIZE, COMPRESSION_CACHE_TTL)
+
+_stats = {"compressed": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0, "skipped_small": 0}
+_stats_lock = threading.Lock()
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress body with `encoding` at the configured level, or the highest level when `best`."""
+    compressor, level, best_level = COMPRESSORS[encoding]
+    return compressor(body, best_level if best else level)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate_encoding(header: str, encodings: List[str] = AVAILABLE_ENCODINGS) -> Optional[str]:
+    """Pick the encoding the client rates highest, ties going to the first in `encodings`; None for identity."""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Strong ETags must differ per content-coding, so each encoded variant gets its own."""
+    if etag.startswith("W/"):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encoding(etag: str) -> str:
+    """The ETag of the identity representation behind an encoded variant's ETag."""
+    for encoding in ("gzip", "br", "zstd"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def is_compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(STREAMING_TYPES)
+
+
+def compress_response_body(body: bytes, encoding: str, cacheable: bool) -> bytes:
+    """Compress a response body, reusing the cached result for a body seen before."""
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding) if cacheable else None
+    compressed = response_cache.get(key) if key else None
+    cache_hit = compressed is not None
+    if not cache_hit:
+        compressed = compress(body, encoding)
+        if key:
+            response_cache.set(key, compressed)
+    with _stats_lock:
+        _stats["cache_hits"] += cache_hit
+        _stats["compressed"] += 1
+        _stats["bytes_in"] += len(body)
+        _stats["bytes_out"] += len(compressed)
+    return compressed
+
+
+def stats() -> dict:
+    """Return compression counters and cache statistics for monitoring."""
+    with _stats_lock:
+        counters = dict(_stats)
+    ratio = counters["bytes_out"] / counters["bytes_in"] if counters["bytes_in"] else None
+    return {
+        "encodings": AVAILABLE_ENCODINGS,
+        "min_size": COMPRESSION_MIN_SIZE,
+        **counters,
+        "ratio": round(ratio, 3) if ratio is not None else None,
+        "cache": response_cache.stats(),
+    }
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete, non-streaming responses with the negotiated encoding."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not AVAILABLE_ENCODINGS:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if is_compressible(message["status"], headers):
+                    # Hold the headers back until the body shows whether it is worth compressing
+                    start_message = message
+                    return
+                passthrough = True
+                if message["status"] == 304 and encoding and "etag" in headers:
+                    message = self.not_modified_variant(message, request_headers, encoding)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if message["type"] != "http.response.body" or message.get("more_body"):
+                # Sent in several chunks: stream it on uncompressed rather than buffer it
+                passthrough = True
+                await send({**start_message, "headers": headers.raw})
+                await send(message)
+                return
+
+            if encoding and len(body) >= self.minimum_size:
+                cacheable = scope["method"] == "GET" and start_message["status"] == 200
+                if len(body) >= THREADED_MIN_SIZE:
+                    body = await run_in_threadpool(compress_response_body, body, encoding, cacheable)
+                else:
+                    body = compress_response_body(body, encoding, cacheable)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            elif encoding:
+                with _stats_lock:
+                    _stats["skipped_small"] += 1
+            await send({**start_message, "headers": headers.raw})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def not_modified_variant(message: dict, request_headers: Headers, encoding: str) -> dict:
+        """Answer a 304 with the ETag of the variant the client holds, if it holds the encoded one."""
+        headers = MutableHeaders(raw=list(message["headers"]))
+        variant = encoded_etag(headers["etag"], encoding)
+        if variant in request_headers.get("if-none-match", ""):
+            headers["ETag"] = variant
+        headers.add_vary_header("Accept-Encoding")
+        return {**message, "headers": headers.raw}
@@ -1,100 +1,403 @@
 """
 Database operations and initialization for the SNS API.
 """
+import json
+import logging
+import math
+import os
 import sqlite3
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import List, Optional
-from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from contextlib import closing, contextmanager
 
 from models import Post, Comment, NewPostRequest, UpdatePostRequest, NewCommentRequest, UpdateCommentRequest
+from pagination import DEFAULT_PAGE_SIZE, NUMBER_TYPES, InvalidCursorError, encode_cursor, decode_cursor
+from db_pool import ConnectionPool
+from migrations import apply_migrations
+from cache import TTLCache
+from write_queue import WRITE_QUEUE_ENABLED, WriteQueue
+from change_watcher import CHANGE_WATCH_ENABLED, ChangeWatcher
+from hot_set import HOT_SET_SIZE, HotSet
+from ranking import (
+    SORT_ORDERS, LIKE_WEIGHT, COMMENT_WEIGHT, POST_WEIGHT, TRENDING_HALF_LIFE_HOURS,
+    add_trending_weight, decay_rate, event_weight, get_epoch, rebase_trending_scores, recompute_trending_scores,
+)
 
 
 DATABASE_NAME = "sns_api.db"
 
+POST_CACHE_SIZE = int(os.environ.get("SNS_POST_CACHE_SIZE", "1024"))
+POST_CACHE_TTL = float(os.environ.get("SNS_POST_CACHE_TTL", "30"))
 
-def init_database():
-    """Initialize the SQLite database with required tables."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        
-        # Create posts table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS posts (
-                id TEXT PRIMARY KEY,
-                username TEXT NOT NULL,
-                content TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        """)
-        
-        # Create comments table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS comments (
-                id TEXT PRIMARY KEY,
-                post_id TEXT NOT NULL,
-                username TEXT NOT NULL,
-                content TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create likes table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS likes (
-                post_id TEXT NOT NULL,
-                username TEXT NOT NULL,
-                liked_at TEXT NOT NULL,
-                PRIMARY KEY (post_id, username),
-                FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE
-            )
-        """)
+# Change rows older than this are pruned; delta-sync clients that fall further behind must resync
+CHANGE_RETENTION_HOURS = float(os.environ.get("SNS_CHANGE_RETENTION_HOURS", "168"))
+CHANGE_PRUNE_INTERVAL = float(os.environ.get("SNS_CHANGE_PRUNE_INTERVAL", "3600"))
+
+T = TypeVar("T")
+
+
+class PostNotFoundError(LookupError):
+    """Raised when a write references a post that does not exist."""
+
+
+class ChangesUnavailableError(LookupError):
+    """Raised when the changes after a delta-sync position can no longer be served."""
+
+    def __init__(self, since: int, pruned_through: int, latest_seq: int):
+        if since > latest_seq:
+            reason = f"change {since} was never recorded by this database"
+        else:
+            reason = f"changes up to {pruned_through} have been pruned"
+        super().__init__(f"Cannot sync from change {since}: {reason}; download the data again and sync from {latest_seq}")
+        self.latest_seq = latest_seq
+
+
+_pool: Optional[ConnectionPool] = None
+_write_queue: Optional[WriteQueue] = None
+_change_watcher: Optional[ChangeWatcher] = None
+_init_lock = threading.Lock()
+
+# Hot read path for get_post_by_id; every write that changes a post invalidates its entry
+post_cache = TTLCache(POST_CACHE_SIZE, POST_CACHE_TTL)
+
+# Newest posts mirrored in memory when SNS_HOT_SET_SIZE is set; follows change events once loaded
+hot_set = HotSet(HOT_SET_SIZE)
+# Last changes row reflected in the hot set, where the change watcher has to pick up
+_hot_set_seq: Optional[int] = None
+# Serializes hot set refreshes, so a row read before a later commit is never applied after it
+_hot_set_refresh_lock = threading.Lock()
+
+# Called with (event_type, data) after a write commits, e.g. to push live updates
+ChangeListener = Callable[[str, dict], None]
+_change_listeners: List[ChangeListener] = []
+
+logger = logging.getLogger(__name__)
+
+
+def init_database() -> List[int]:
+    """Initialize the SQLite database and apply pending schema migrations, returning their versions."""
+    with closing(sqlite3.connect(DATABASE_NAME)) as conn:
+        # WAL lets readers proceed while a write is in progress; the mode is persistent
+        conn.execute("PRAGMA journal_mode=WAL")
+        applied = apply_migrations(conn)
         
-        conn.commit()
+        # Stored trending weights depend on the half-life they were computed with
+        half_life = conn.execute("SELECT half_life_hours FROM ranking_state WHERE id = 1").fetchone()[0]
+        if half_life != TRENDING_HALF_LIFE_HOURS:
+            conn.execute("BEGIN IMMEDIATE")
+            recompute_trending_scores(conn, time.time())
+            conn.commit()
+        return applied
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _init_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DATABASE_NAME)
+        return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def get_write_queue() -> Optional[WriteQueue]:
+    """Return the group-commit write queue when it is enabled, starting it on first use."""
+    global _write_queue
+    if not WRITE_QUEUE_ENABLED:
+        return None
+    with _init_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(DATABASE_NAME)
+        return _write_queue
+
+
+def close_write_queue():
+    """Flush pending writes and stop the group-commit writer thread."""
+    global _write_queue
+    if _write_queue is not None:
+        _write_queue.close()
+        _write_queue = None
+
+
+def get_write_queue_stats() -> Optional[dict]:
+    """Return group-commit statistics, or None when the write queue is disabled."""
+    write_queue = get_write_queue()
+    return write_queue.stats() if write_queue else None
+
+
+def add_change_listener(listener: ChangeListener):
+    """Register a function to be called after every committed change."""
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener: ChangeListener):
+    """Unregister a change listener."""
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def notify_change(event_type: str, data: dict):
+    """Tell every change listener about a committed write; a failing listener never fails the write."""
+    for listener in list(_change_listeners):
+        try:
+            listener(event_type, data)
+        except Exception:
+            logger.exception("Change listener failed for %s", event_type)
+
+
+def get_process_origin() -> str:
+    """Identify this process's rows in the changes table; every worker process has its own pid."""
+    return str(os.getpid())
+
+
+def apply_remote_change(seq: int, event_type: str, post_id: str, data: dict, origin: Optional[str]):
+    """Bring this process up to date with a change committed by another process."""
+    if origin == get_process_origin():
+        return
+    post_cache.invalidate(post_id)
+    notify_change(event_type, data)
+
+
+def start_change_watcher() -> Optional[ChangeWatcher]:
+    """Start following other processes' writes when SNS_WATCH_CHANGES is enabled."""
+    global _change_watcher
+    if not CHANGE_WATCH_ENABLED:
+        return None
+    with _init_lock:
+        if _change_watcher is None:
+            _change_watcher = ChangeWatcher(DATABASE_NAME, apply_remote_change, since=_hot_set_seq)
+        return _change_watcher
+
+
+def stop_change_watcher():
+    """Stop following other processes' writes."""
+    global _change_watcher
+    if _change_watcher is not None:
+        _change_watcher.close()
+        _change_watcher = None
+
+
+def get_change_watcher_stats() -> Optional[dict]:
+    """Return change watcher statistics, or None when it is not running."""
+    return _change_watcher.stats() if _change_watcher else None
+
+
+def get_pool_stats() -> dict:
+    """Return connection pool statistics for monitoring."""
+    return get_pool().stats()
+
+
+def get_cache_stats() -> dict:
+    """Return post cache statistics for monitoring."""
+    return post_cache.stats()
+
+
+def load_hot_set() -> Optional[int]:
+    """Load the newest posts into the hot set and keep it current; returns the posts loaded, or None if disabled."""
+    # Call before start_change_watcher(), which resumes from this snapshot, and again after rows were
+    # written without going through this module (see benchmarks/datagen.py); never during writes
+    global _hot_set_seq
+    if not hot_set.enabled:
+        return None
+    with get_db_connection() as conn:
+        # One read transaction, so the posts and the change sequence come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            db_cursor = conn.cursor()
+            db_cursor.row_factory = None
+            db_cursor.execute("""
+                SELECT id, username, content, created_at, updated_at, likes_count, comments_count, comments_version
+                FROM posts
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (hot_set.capacity + 1,))
+            rows = db_cursor.fetchall()
+            _hot_set_seq = conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+        finally:
+            conn.rollback()
+    
+    hot_set.load(rows)
+    if refresh_hot_set not in _change_listeners:
+        add_change_listener(refresh_hot_set)
+    return min(len(rows), hot_set.capacity)
+
+
+def refresh_hot_set(event_type: str, data: dict):
+    """Change listener: re-read the post a committed change touched into the hot set."""
+    post_id = data["postId"] if "postId" in data else data["id"]
+    with _hot_set_refresh_lock:
+        # A post created after its first like or comment event is read with them, so other posts can be skipped
+        if event_type != "post.created" and post_id not in hot_set:
+            return
+        with get_db_connection() as conn:
+            db_cursor = conn.cursor()
+            db_cursor.row_factory = None
+            db_cursor.execute("""
+                SELECT id, username, content, created_at, updated_at, likes_count, comments_count, comments_version
+                FROM posts
+                WHERE id = ?
+            """, (post_id,))
+            row = db_cursor.fetchone()
+        hot_set.refresh(post_id, row)
+
+
+def get_hot_set_stats() -> Optional[dict]:
+    """Return hot set size, hit and memory statistics, or None when it is disabled."""
+    if not hot_set.enabled:
+        return None
+    return {**hot_set.stats(), "memory": hot_set.memory_usage()}
+
+
+def is_foreign_key_violation(error: sqlite3.IntegrityError) -> bool:
+    """Whether an IntegrityError was raised by a foreign key constraint."""
+    return "FOREIGN KEY constraint failed" in str(error)
 
 
 @contextmanager
 def get_db_connection():
-    """Get database connection context manager."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
-    try:
+    """Get database connection context manager backed by the connection pool."""
+    with get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
-def get_all_posts() -> List[Post]:
-    """Retrieve all posts with likes and comments counts."""
+def tag_origin(operation: Callable[[sqlite3.Connection], T]) -> Callable[[sqlite3.Connection], T]:
+    """Mark the change rows an operation writes as this process's, so its own change watcher skips them."""
+    # Runs inside the write transaction, so no other process adds change rows between read and tagging
+    def tagged(conn: sqlite3.Connection) -> T:
+        last_seq = conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+        result = operation(conn)
+        conn.execute("UPDATE changes SET origin = ? WHERE seq > ?", (get_process_origin(), last_seq))
+        return result
+    return tagged
+
+
+def run_write(operation: Callable[[sqlite3.Connection], T]) -> T:
+    """Run a write operation, which must not commit itself, in a transaction and return its result."""
+    if _change_watcher is not None:
+        operation = tag_origin(operation)
+    
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        # Committed together with other concurrent writes in one group commit
+        return write_queue.submit(operation).result()
+    
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+        # Take the write lock up front instead of upgrading a read transaction mid-way
+        conn.execute("BEGIN IMMEDIATE")
+        result = operation(conn)
+        conn.commit()
+        return result
+
+
+POST_FIELDS = ("id", "username", "content", "createdAt", "updatedAt", "likesCount", "commentsCount")
+COMMENT_FIELDS = ("id", "postId", "username", "content", "createdAt", "updatedAt")
+LIKE_FIELDS = ("postId", "username", "likedAt")
+
+SEARCH_FIELDS = ("type", "id", "postId", "username", "content", "createdAt", "score")
+EXPORT_BATCH_SIZE = 500
+CHANGES_PAGE_SIZE = 100
+MAX_CHANGES_PAGE_SIZE = 1000
+
+
+# Column each sort order pages through, newest or highest first
+SORT_KEYS = {"recent": "p.created_at", "top": "p.top_score", "trending": "p.trending_score"}
+# Types of the values in each sort order's cursor: its sort key, the post id and, for trending, the score epoch
+CURSOR_TYPES = {
+    "recent": [(str,), (str,)],
+    "top": [NUMBER_TYPES, (str,)],
+    "trending": [NUMBER_TYPES, (str,), NUMBER_TYPES],
+}
+
+
+def get_all_posts_rows(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+    sort: str = "recent"
+) -> Tuple[List[dict], Optional[str]]:
+    """Retrieve a page of posts shaped like the Post schema and the cursor of the next page, or None."""
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort}")
+    if username is not None and sort != "recent":
+        raise ValueError("Posts filtered by username can only be sorted by recent")
+    sort_key = SORT_KEYS[sort]
+    
+    if sort == "recent" and username is None and hot_set.enabled:
+        before = decode_cursor(cursor, 2) if cursor else None
+        if before is None or all(isinstance(value, str) for value in before):
+            rows = hot_set.page(limit + 1, before)
+            if rows is not None:
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_cursor(rows[-1]["createdAt"], rows[-1]["id"])
+                return rows, next_cursor
+    
+    conditions = []
+    params: tuple = ()
+    if username is not None:
+        conditions.append("p.username = ?")
+        params += (username,)
+    if sort == "trending":
+        # Matches the partial index, which holds only posts that are still trending
+        conditions.append("p.trending_score > 0")
+    
+    with get_db_connection() as conn:
+        epoch = get_epoch(conn) if sort == "trending" else None
+        if cursor:
+            conditions.append(f"({sort_key}, p.id) < (?, ?)")
+            if sort == "trending":
+                score, post_id, cursor_epoch = decode_cursor(cursor, 3, CURSOR_TYPES["trending"])
+                try:
+                    # Scores were rescaled if the epoch moved since the previous page
+                    params += (score * math.exp(-decay_rate() * (epoch - cursor_epoch)), post_id)
+                except OverflowError:
+                    # Only a forged epoch lies far enough from the current one
+                    raise InvalidCursorError("Invalid cursor")
+            else:
+                params += decode_cursor(cursor, 2, CURSOR_TYPES[sort])
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = None
+        db_cursor.execute(f"""
             SELECT 
                 p.id, p.username, p.content, p.created_at, p.updated_at,
-                COUNT(DISTINCT l.username) as likes_count,
-                COUNT(DISTINCT c.id) as comments_count
+                p.likes_count, p.comments_count, {sort_key}
             FROM posts p
-            LEFT JOIN likes l ON p.id = l.post_id
-            LEFT JOIN comments c ON p.id = c.post_id
-            GROUP BY p.id, p.username, p.content, p.created_at, p.updated_at
-            ORDER BY p.created_at DESC
-        """)
-        
-        posts = []
-        for row in cursor.fetchall():
-            posts.append(Post(
-                id=row["id"],
-                username=row["username"],
-                content=row["content"],
-                createdAt=row["created_at"],
-                updatedAt=row["updated_at"],
-                likesCount=row["likes_count"],
-                commentsCount=row["comments_count"]
-            ))
-        return posts
+            {where_clause}
+            ORDER BY {sort_key} DESC, p.id DESC
+            LIMIT ?
+        """, params + (limit + 1,))
+        rows = db_cursor.fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[-1], last[0], epoch) if sort == "trending" else encode_cursor(last[-1], last[0])
+    return [dict(zip(POST_FIELDS, row)) for row in rows], next_cursor
+
+
+def get_all_posts(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+    sort: str = "recent"
+) -> Tuple[List[Post], Optional[str]]:
+    """Retrieve a page of posts, as get_all_posts_rows() selects them, and the cursor of the next page."""
+    rows, next_cursor = get_all_posts_rows(limit=limit, cursor=cursor, username=username, sort=sort)
+    return [Post(**row) for row in rows], next_cursor
 
 
 def create_post(post_data: NewPostRequest) -> Post:
@@ -102,15 +405,16 @@ def create_post(post_data: NewPostRequest) -> Post:
     post_id = str(uuid.uuid4())
     now = datetime.utcnow().isoformat() + "Z"
     
-    with get_db_connection() as conn:
+    def insert_post(conn: sqlite3.Connection):
+        trending_score = event_weight(now, get_epoch(conn), POST_WEIGHT)
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO posts (id, username, content, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (post_id, post_data.username, post_data.content, now, now))
-        conn.commit()
+            INSERT INTO posts (id, username, content, created_at, updated_at, trending_score)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (post_id, post_data.username, post_data.content, now, now, trending_score))
     
-    return Post(
+    run_write(insert_post)
+    post = Post(
         id=post_id,
         username=post_data.username,
         content=post_data.content,
@@ -119,27 +423,64 @@ def create_post(post_data: NewPostRequest) -> Post:
         likesCount=0,
         commentsCount=0
     )
+    notify_change("post.created", post.model_dump(mode="json"))
+    return post
 
 
-def get_post_by_id(post_id: str) -> Optional[Post]:
-    """Retrieve a post by its ID."""
+def create_posts_batch(posts_data: List[NewPostRequest]) -> List[Post]:
+    """Create several posts in a single transaction."""
+    now = datetime.utcnow().isoformat() + "Z"
+    posts = [
+        Post(
+            id=str(uuid.uuid4()),
+            username=post_data.username,
+            content=post_data.content,
+            createdAt=now,
+            updatedAt=now,
+            likesCount=0,
+            commentsCount=0
+        )
+        for post_data in posts_data
+    ]
+    
+    def insert_posts(conn: sqlite3.Connection):
+        trending_score = event_weight(now, get_epoch(conn), POST_WEIGHT)
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO posts (id, username, content, created_at, updated_at, trending_score)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(post.id, post.username, post.content, now, now, trending_score) for post in posts])
+    
+    run_write(insert_posts)
+    for post in posts:
+        notify_change("post.created", post.model_dump(mode="json"))
+    return posts
+
+
+def get_post_by_id(post_id: str, cached: bool = True) -> Optional[Post]:
+    """Retrieve a post by its ID, served from the hot set or the post cache when `cached` allows."""
+    row = hot_set.get_row(post_id) if cached and hot_set.enabled else None
+    if row is not None:
+        return Post(**row)
+    
+    post = post_cache.get(post_id) if cached else None
+    if post is not None:
+        return post
+    
+    generation = post_cache.generation()
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT 
                 p.id, p.username, p.content, p.created_at, p.updated_at,
-                COUNT(DISTINCT l.username) as likes_count,
-                COUNT(DISTINCT c.id) as comments_count
+                p.likes_count, p.comments_count
             FROM posts p
-            LEFT JOIN likes l ON p.id = l.post_id
-            LEFT JOIN comments c ON p.id = c.post_id
             WHERE p.id = ?
-            GROUP BY p.id, p.username, p.content, p.created_at, p.updated_at
         """, (post_id,))
         
         row = cursor.fetchone()
         if row:
-            return Post(
+            post = Post(
                 id=row["id"],
                 username=row["username"],
                 content=row["content"],
@@ -148,81 +489,291 @@ def get_post_by_id(post_id: str) -> Optional[Post]:
                 likesCount=row["likes_count"],
                 commentsCount=row["comments_count"]
             )
+            post_cache.set(post_id, post, generation=generation)
+            return post
         return None
 
 
+def get_post_validators(post_id: str) -> Optional[dict]:
+    """Read the columns that change whenever a post or its comment list changes; None if the post does not exist."""
+    # One primary-key lookup answers a conditional request without loading the post or comments
+    validators = hot_set.get_validators(post_id) if hot_set.enabled else None
+    if validators is not None:
+        return validators
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT updated_at, likes_count, comments_count, comments_version
+            FROM posts
+            WHERE id = ?
+        """, (post_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
 def update_post(post_id: str, post_data: UpdatePostRequest) -> Optional[Post]:
     """Update an existing post."""
     now = datetime.utcnow().isoformat() + "Z"
     
-    with get_db_connection() as conn:
+    def update_post_row(conn: sqlite3.Connection) -> Optional[tuple]:
         cursor = conn.cursor()
+        # Read the row back here: get_post_by_id() may answer from the hot set, which the event below updates
         cursor.execute("""
             UPDATE posts 
             SET content = ?, updated_at = ?
             WHERE id = ? AND username = ?
+            RETURNING id, username, content, created_at, updated_at, likes_count, comments_count
         """, (post_data.content, now, post_id, post_data.username))
-        
-        if cursor.rowcount == 0:
-            return None
-        
-        conn.commit()
+        row = cursor.fetchone()
+        return tuple(row) if row else None
+    
+    row = run_write(update_post_row)
+    if row is None:
+        return None
     
-    return get_post_by_id(post_id)
+    post_cache.invalidate(post_id)
+    post = Post(**dict(zip(POST_FIELDS, row)))
+    notify_change("post.updated", post.model_dump(mode="json"))
+    return post
 
 
 def delete_post(post_id: str) -> bool:
     """Delete a post by its ID."""
-    with get_db_connection() as conn:
+    def delete_post_row(conn: sqlite3.Connection) -> bool:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        return deleted
+        return cursor.rowcount > 0
+    
+    deleted = run_write(delete_post_row)
+    post_cache.invalidate(post_id)
+    if deleted:
+        notify_change("post.deleted", {"id": post_id})
+    return deleted
 
 
-def get_comments_by_post_id(post_id: str) -> List[Comment]:
-    """Retrieve all comments for a specific post."""
+def get_comments_rows_by_post_id(post_id: str) -> List[dict]:
+    """Retrieve all comments for a post as plain dicts shaped like the Comment schema."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = None
         cursor.execute("""
             SELECT id, post_id, username, content, created_at, updated_at
             FROM comments
             WHERE post_id = ?
             ORDER BY created_at ASC
         """, (post_id,))
-        
-        comments = []
+        return [dict(zip(COMMENT_FIELDS, row)) for row in cursor.fetchall()]
+
+
+def get_comments_by_post_id(post_id: str) -> List[Comment]:
+    """Retrieve all comments for a specific post."""
+    return [Comment(**row) for row in get_comments_rows_by_post_id(post_id)]
+
+
+def get_comments_rows_by_post_ids(post_ids: List[str]) -> Dict[str, List[dict]]:
+    """Retrieve the comments of several posts in one query, grouped by post id."""
+    grouped = {post_id: [] for post_id in post_ids}
+    if not post_ids:
+        return grouped
+    
+    placeholders = ",".join("?" * len(post_ids))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"""
+            SELECT id, post_id, username, content, created_at, updated_at
+            FROM comments
+            WHERE post_id IN ({placeholders})
+            ORDER BY post_id, created_at ASC
+        """, post_ids)
         for row in cursor.fetchall():
-            comments.append(Comment(
-                id=row["id"],
-                postId=row["post_id"],
-                username=row["username"],
-                content=row["content"],
-                createdAt=row["created_at"],
-                updatedAt=row["updated_at"]
-            ))
-        return comments
+            grouped[row[1]].append(dict(zip(COMMENT_FIELDS, row)))
+    return grouped
 
 
-def create_comment(post_id: str, comment_data: NewCommentRequest) -> Optional[Comment]:
-    """Create a new comment for a post."""
-    # Check if post exists
-    if not get_post_by_id(post_id):
-        return None
+def get_likes_rows_by_post_ids(post_ids: List[str]) -> Dict[str, List[dict]]:
+    """Retrieve the likes of several posts in one query, grouped by post id."""
+    grouped = {post_id: [] for post_id in post_ids}
+    if not post_ids:
+        return grouped
+    
+    placeholders = ",".join("?" * len(post_ids))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"""
+            SELECT post_id, username, liked_at
+            FROM likes
+            WHERE post_id IN ({placeholders})
+        """, post_ids)
+        for row in cursor.fetchall():
+            grouped[row[0]].append(dict(zip(LIKE_FIELDS, row)))
+    return grouped
+
+
+def get_likes_rows_by_username(
+    username: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Retrieve a page of a user's likes, most recent first, and the cursor of the next page."""
+    where_clause = ""
+    params: tuple = (username,)
+    if cursor:
+        where_clause = "AND (liked_at, post_id) < (?, ?)"
+        params += decode_cursor(cursor, 2, [(str,), (str,)])
     
+    with get_db_connection() as conn:
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = None
+        db_cursor.execute(f"""
+            SELECT post_id, username, liked_at
+            FROM likes
+            WHERE username = ? {where_clause}
+            ORDER BY liked_at DESC, post_id DESC
+            LIMIT ?
+        """, params + (limit + 1,))
+        rows = [dict(zip(LIKE_FIELDS, row)) for row in db_cursor.fetchall()]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["likedAt"], rows[-1]["postId"])
+    return rows, next_cursor
+
+
+def iter_posts_for_export(
+    include_comments: bool = False,
+    include_likes: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[dict]]:
+    """Yield every post, newest first, in batches of at most batch_size rows."""
+    cursor = None
+    # One keyset page per batch: one batch in memory, and no connection held between batches
+    while True:
+        rows, cursor = get_all_posts_rows(limit=batch_size, cursor=cursor)
+        if not rows:
+            return
+        
+        post_ids = [row["id"] for row in rows]
+        if include_comments:
+            comments = get_comments_rows_by_post_ids(post_ids)
+            for row in rows:
+                row["comments"] = comments[row["id"]]
+        if include_likes:
+            likes = get_likes_rows_by_post_ids(post_ids)
+            for row in rows:
+                row["likes"] = likes[row["id"]]
+        yield rows
+        
+        if cursor is None:
+            return
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into an FTS5 query that matches documents containing every word."""
+    # Quoted, so FTS5 operators and punctuation in user input are searched for literally
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def search_content(query: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Full-text search over post and comment content, best matches first, and the cursor of the next page."""
+    match = build_match_query(query)
+    if not match:
+        raise ValueError("Search query must contain at least one word")
+    
+    where_clause = ""
+    params: tuple = (match, match)
+    if cursor:
+        rank, kind, item_id = decode_cursor(cursor, 3, [NUMBER_TYPES, (str,), (str,)])
+        where_clause = "WHERE (rank, type, id) > (?, ?, ?)"
+        params += (rank, kind, item_id)
+    
+    with get_db_connection() as conn:
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = None
+        db_cursor.execute(f"""
+            SELECT type, id, post_id, username, content, created_at, rank
+            FROM (
+                SELECT 'post' AS type, p.id, p.id AS post_id, p.username, p.content, p.created_at,
+                       bm25(posts_fts) AS rank
+                FROM posts_fts
+                JOIN posts p ON p.rowid = posts_fts.rowid
+                WHERE posts_fts MATCH ?
+                UNION ALL
+                SELECT 'comment' AS type, c.id, c.post_id, c.username, c.content, c.created_at,
+                       bm25(comments_fts) AS rank
+                FROM comments_fts
+                JOIN comments c ON c.rowid = comments_fts.rowid
+                WHERE comments_fts MATCH ?
+            )
+            {where_clause}
+            ORDER BY rank, type, id
+            LIMIT ?
+        """, params + (limit + 1,))
+        rows = db_cursor.fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][6], rows[-1][0], rows[-1][1])
+    return [dict(zip(SEARCH_FIELDS, row[:6] + (-row[6],))) for row in rows], next_cursor
+
+
+def rebuild_search_index():
+    """Rebuild the full-text indexes from the posts and comments tables."""
+    def rebuild(conn: sqlite3.Connection):
+        conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')")
+    
+    run_write(rebuild)
+
+
+def refresh_trending_scores(min_interval: float = 0) -> Optional[int]:
+    """Decay stored trending scores to the present and return how many posts are still trending, or None if skipped."""
+    now = time.time()
+    
+    # Ranking order never depends on this; it keeps scores bounded and drops decayed posts from the trending index
+    def rebase(conn: sqlite3.Connection) -> Optional[int]:
+        # Another process refreshed recently enough
+        if now - get_epoch(conn) < min_interval:
+            return None
+        return rebase_trending_scores(conn, now)
+    
+    return run_write(rebase)
+
+
+def rebuild_trending_scores() -> int:
+    """Recompute every trending score from the posts, likes and comments tables and return how many posts are trending."""
+    # Only needed after rows were loaded without going through this module
+    return run_write(lambda conn: recompute_trending_scores(conn, time.time()))
+
+
+def create_comment(post_id: str, comment_data: NewCommentRequest) -> Optional[Comment]:
+    """Create a new comment for a post; None if the post does not exist."""
     comment_id = str(uuid.uuid4())
     now = datetime.utcnow().isoformat() + "Z"
     
-    with get_db_connection() as conn:
+    def insert_comment(conn: sqlite3.Connection) -> bool:
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO comments (id, post_id, username, content, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (comment_id, post_id, comment_data.username, comment_data.content, now, now))
-        conn.commit()
+        try:
+            cursor.execute("""
+                INSERT INTO comments (id, post_id, username, content, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (comment_id, post_id, comment_data.username, comment_data.content, now, now))
+        except sqlite3.IntegrityError as e:
+            if is_foreign_key_violation(e):
+                return False
+            raise
+        add_trending_weight(conn, post_id, [now], COMMENT_WEIGHT)
+        return True
     
-    return Comment(
+    if not run_write(insert_comment):
+        return None
+    
+    post_cache.invalidate(post_id)
+    comment = Comment(
         id=comment_id,
         postId=post_id,
         username=comment_data.username,
@@ -230,6 +781,50 @@ def create_comment(post_id: str, comment_data: NewCommentRequest) -> Optional[Co
         createdAt=now,
         updatedAt=now
     )
+    notify_change("comment.created", comment.model_dump(mode="json"))
+    return comment
+
+
+def create_comments_batch(post_id: str, comments_data: List[NewCommentRequest]) -> Optional[List[Comment]]:
+    """Create several comments on a post in a single transaction; None if the post does not exist."""
+    now = datetime.utcnow().isoformat() + "Z"
+    comments = [
+        Comment(
+            id=str(uuid.uuid4()),
+            postId=post_id,
+            username=comment_data.username,
+            content=comment_data.content,
+            createdAt=now,
+            updatedAt=now
+        )
+        for comment_data in comments_data
+    ]
+    
+    def insert_comments(conn: sqlite3.Connection) -> bool:
+        cursor = conn.cursor()
+        if not comments:
+            # Nothing to insert, so no foreign key can report a missing post
+            cursor.execute("SELECT 1 FROM posts WHERE id = ?", (post_id,))
+            return cursor.fetchone() is not None
+        try:
+            cursor.executemany("""
+                INSERT INTO comments (id, post_id, username, content, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(c.id, post_id, c.username, c.content, now, now) for c in comments])
+        except sqlite3.IntegrityError as e:
+            if is_foreign_key_violation(e):
+                return False
+            raise
+        add_trending_weight(conn, post_id, [now] * len(comments), COMMENT_WEIGHT)
+        return True
+    
+    if not run_write(insert_comments):
+        return None
+    
+    post_cache.invalidate(post_id)
+    for comment in comments:
+        notify_change("comment.created", comment.model_dump(mode="json"))
+    return comments
 
 
 def get_comment_by_id(post_id: str, comment_id: str) -> Optional[Comment]:
@@ -259,59 +854,302 @@ def update_comment(post_id: str, comment_id: str, comment_data: UpdateCommentReq
     """Update an existing comment."""
     now = datetime.utcnow().isoformat() + "Z"
     
-    with get_db_connection() as conn:
+    def update_comment_row(conn: sqlite3.Connection) -> bool:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE comments 
             SET content = ?, updated_at = ?
             WHERE id = ? AND post_id = ? AND username = ?
         """, (comment_data.content, now, comment_id, post_id, comment_data.username))
-        
-        if cursor.rowcount == 0:
-            return None
-        
-        conn.commit()
+        return cursor.rowcount > 0
+    
+    if not run_write(update_comment_row):
+        return None
     
-    return get_comment_by_id(post_id, comment_id)
+    comment = get_comment_by_id(post_id, comment_id)
+    if comment:
+        notify_change("comment.updated", comment.model_dump(mode="json"))
+    return comment
 
 
 def delete_comment(post_id: str, comment_id: str) -> bool:
     """Delete a comment by post and comment IDs."""
-    with get_db_connection() as conn:
+    def delete_comment_row(conn: sqlite3.Connection) -> bool:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM comments WHERE id = ? AND post_id = ?", (comment_id, post_id))
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        return deleted
+        cursor.execute("DELETE FROM comments WHERE id = ? AND post_id = ? RETURNING created_at", (comment_id, post_id))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        add_trending_weight(conn, post_id, [row["created_at"]], -COMMENT_WEIGHT)
+        return True
+    
+    deleted = run_write(delete_comment_row)
+    if deleted:
+        post_cache.invalidate(post_id)
+        notify_change("comment.deleted", {"id": comment_id, "postId": post_id})
+    return deleted
 
 
 def add_like(post_id: str, username: str) -> Optional[str]:
-    """Add a like to a post."""
-    # Check if post exists
-    if not get_post_by_id(post_id):
-        return None
-    
+    """Add a like to a post and return its timestamp, or None if the user already liked it."""
     now = datetime.utcnow().isoformat() + "Z"
     
-    with get_db_connection() as conn:
+    def insert_like(conn: sqlite3.Connection) -> Optional[str]:
         cursor = conn.cursor()
         try:
+            # The foreign key rejects unknown posts; ON CONFLICT turns a duplicate into no row
             cursor.execute("""
                 INSERT INTO likes (post_id, username, liked_at)
                 VALUES (?, ?, ?)
+                ON CONFLICT (post_id, username) DO NOTHING
+                RETURNING liked_at
             """, (post_id, username, now))
-            conn.commit()
-            return now
-        except sqlite3.IntegrityError:
-            # Like already exists
+            row = cursor.fetchone()
+        except sqlite3.IntegrityError as e:
+            if is_foreign_key_violation(e):
+                raise PostNotFoundError(post_id) from e
+            raise
+        if row is None:
             return None
+        add_trending_weight(conn, post_id, [row["liked_at"]], LIKE_WEIGHT)
+        return row["liked_at"]
+    
+    liked_at = run_write(insert_like)
+    if liked_at is not None:
+        post_cache.invalidate(post_id)
+        notify_change("like.added", {"postId": post_id, "username": username, "likedAt": liked_at})
+    return liked_at
+
+
+def add_likes_batch(post_id: str, usernames: List[str]) -> Optional[List[Optional[str]]]:
+    """Add likes from several users to a post in one transaction; None if the post does not exist."""
+    # Maps each username to its like timestamp, or None if it already liked the post or repeats in the batch
+    now = datetime.utcnow().isoformat() + "Z"
+    
+    def insert_likes(conn: sqlite3.Connection) -> Optional[Tuple[List[Optional[str]], List[str]]]:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM posts WHERE id = ?", (post_id,))
+        if cursor.fetchone() is None:
+            return None
+        
+        placeholders = ",".join("?" * len(usernames))
+        cursor.execute(f"""
+            SELECT username FROM likes
+            WHERE post_id = ? AND username IN ({placeholders})
+        """, [post_id, *usernames])
+        seen = {row["username"] for row in cursor.fetchall()}
+        
+        results = []
+        new_usernames = []
+        for username in usernames:
+            if username in seen:
+                results.append(None)
+                continue
+            seen.add(username)
+            new_usernames.append(username)
+            results.append(now)
+        
+        cursor.executemany("""
+            INSERT INTO likes (post_id, username, liked_at)
+            VALUES (?, ?, ?)
+        """, [(post_id, username, now) for username in new_usernames])
+        add_trending_weight(conn, post_id, [now] * len(new_usernames), LIKE_WEIGHT)
+        return results, new_usernames
+    
+    outcome = run_write(insert_likes)
+    if outcome is None:
+        return None
+    
+    results, new_usernames = outcome
+    if new_usernames:
+        post_cache.invalidate(post_id)
+    for username in new_usernames:
+        notify_change("like.added", {"postId": post_id, "username": username, "likedAt": now})
+    return results
 
 
 def remove_like(post_id: str, username: str) -> bool:
     """Remove a like from a post."""
-    with get_db_connection() as conn:
+    def delete_like_row(conn: sqlite3.Connection) -> bool:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM likes WHERE post_id = ? AND username = ?", (post_id, username))
-        deleted = cursor.rowcount > 0
-        conn.commit()
+        cursor.execute("DELETE FROM likes WHERE post_id = ? AND username = ? RETURNING liked_at", (post_id, username))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        add_trending_weight(conn, post_id, [row["liked_at"]], -LIKE_WEIGHT)
+        return True
+    
+    deleted = run_write(delete_like_row)
+    if deleted:
+        post_cache.invalidate(post_id)
+        notify_change("like.removed", {"postId": post_id, "username": username})
+    return deleted
+
+
+def check_post_counters(repair: bool = False) -> List[dict]:
+    """Find posts whose denormalized counters drifted from the likes/comments tables, recomputing them when `repair`."""
+    def find_drifted(conn: sqlite3.Connection) -> List[dict]:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, likes_count, comments_count, actual_likes, actual_comments
+            FROM (
+                SELECT 
+                    p.id, p.likes_count, p.comments_count,
+                    (SELECT COUNT(*) FROM likes l WHERE l.post_id = p.id) as actual_likes,
+                    (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id) as actual_comments
+                FROM posts p
+            )
+            WHERE likes_count != actual_likes OR comments_count != actual_comments
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    if not repair:
+        with get_db_connection() as conn:
+            return find_drifted(conn)
+    
+    def repair_counters(conn: sqlite3.Connection) -> Tuple[List[dict], List[tuple]]:
+        # Reported and fixed in one write transaction, so a like or comment committed meanwhile cannot be overwritten
+        drifted = find_drifted(conn)
+        if not drifted:
+            return drifted, []
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE posts
+            SET likes_count = (SELECT COUNT(*) FROM likes l WHERE l.post_id = posts.id),
+                comments_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id)
+            WHERE likes_count != (SELECT COUNT(*) FROM likes l WHERE l.post_id = posts.id)
+                OR comments_count != (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id)
+            RETURNING id, username, content, created_at, updated_at, likes_count, comments_count
+        """)
+        repaired = [tuple(row) for row in cursor.fetchall()]
+        # Counter updates fire no change trigger; record them for other workers and delta-sync clients
+        cursor.executemany("""
+            INSERT INTO changes (event, entity_id, post_id, data, changed_at)
+            VALUES ('post.updated', ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        """, [(row[0], row[0], json.dumps(dict(zip(POST_FIELDS, row)))) for row in repaired])
+        return drifted, repaired
+    
+    drifted, repaired = run_write(repair_counters)
+    for row in repaired:
+        post_cache.invalidate(row[0])
+        notify_change("post.updated", dict(zip(POST_FIELDS, row)))
+    return drifted
+
+
+def get_latest_change_seq(conn: sqlite3.Connection) -> int:
+    """Sequence number of the last change recorded, even if its row was pruned."""
+    # AUTOINCREMENT never reuses a pruned seq, so an empty log ends where pruning stopped
+    return conn.execute("""
+        SELECT COALESCE((SELECT MAX(seq) FROM changes), pruned_through)
+        FROM change_log_state
+        WHERE id = 1
+    """).fetchone()[0]
+
+
+def get_changes_since(since: int = 0, limit: int = CHANGES_PAGE_SIZE) -> dict:
+    """Return the current state of everything up to `limit` changes after `since` touched, shaped like ChangesResponse."""
+    with get_db_connection() as conn:
+        # One read transaction, so the log and the rows it points at come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            pruned_through = conn.execute("SELECT pruned_through FROM change_log_state WHERE id = 1").fetchone()[0]
+            latest_seq = get_latest_change_seq(conn)
+            if since < pruned_through or since > latest_seq:
+                raise ChangesUnavailableError(since, pruned_through, latest_seq)
+            
+            db_cursor = conn.cursor()
+            db_cursor.row_factory = None
+            db_cursor.execute("""
+                SELECT seq, event, entity_id, post_id
+                FROM changes
+                WHERE seq > ?
+                ORDER BY seq
+                LIMIT ?
+            """, (since, limit))
+            changes = db_cursor.fetchall()
+            
+            # Dicts as ordered sets, so entries come back in the order they first changed
+            post_ids: Dict[str, None] = {}
+            comment_post_ids: Dict[str, str] = {}
+            like_keys: Dict[Tuple[str, str], None] = {}
+            for _, event, entity_id, post_id in changes:
+                post_ids[post_id] = None
+                kind = event.partition(".")[0]
+                if kind == "comment":
+                    comment_post_ids[entity_id] = post_id
+                elif kind == "like":
+                    like_keys[(post_id, entity_id)] = None
+            
+            posts = {}
+            if post_ids:
+                db_cursor.execute(f"""
+                    SELECT id, username, content, created_at, updated_at, likes_count, comments_count
+                    FROM posts
+                    WHERE id IN ({",".join("?" * len(post_ids))})
+                """, list(post_ids))
+                posts = {row[0]: dict(zip(POST_FIELDS, row)) for row in db_cursor.fetchall()}
+            comments = {}
+            if comment_post_ids:
+                db_cursor.execute(f"""
+                    SELECT id, post_id, username, content, created_at, updated_at
+                    FROM comments
+                    WHERE id IN ({",".join("?" * len(comment_post_ids))})
+                """, list(comment_post_ids))
+                comments = {row[0]: dict(zip(COMMENT_FIELDS, row)) for row in db_cursor.fetchall()}
+            likes = {}
+            if like_keys:
+                # Each (post_id, username) pair is a primary-key lookup
+                db_cursor.execute("""
+                    SELECT l.post_id, l.username, l.liked_at
+                    FROM json_each(?) AS touched
+                    JOIN likes l
+                        ON l.post_id = json_extract(touched.value, '$[0]')
+                        AND l.username = json_extract(touched.value, '$[1]')
+                """, (json.dumps(list(like_keys)),))
+                likes = {(row[0], row[1]): dict(zip(LIKE_FIELDS, row)) for row in db_cursor.fetchall()}
+        finally:
+            conn.rollback()
+    
+    deleted = [{"type": "post", "id": post_id, "postId": post_id} for post_id in post_ids if post_id not in posts]
+    deleted += [
+        {"type": "comment", "id": comment_id, "postId": post_id}
+        for comment_id, post_id in comment_post_ids.items() if comment_id not in comments
+    ]
+    deleted += [
+        {"type": "like", "postId": post_id, "username": username}
+        for post_id, username in like_keys if (post_id, username) not in likes
+    ]
+    next_since = changes[-1][0] if changes else since
+    return {
+        "posts": [posts[post_id] for post_id in post_ids if post_id in posts],
+        "comments": [comments[comment_id] for comment_id in comment_post_ids if comment_id in comments],
+        "likes": [likes[key] for key in like_keys if key in likes],
+        "deleted": deleted,
+        "nextSince": next_since,
+        "latestSeq": latest_seq,
+        "hasMore": next_since < latest_seq,
+    }
+
+
+def prune_changes(retention_hours: float = CHANGE_RETENTION_HOURS) -> int:
+    """Delete change rows older than `retention_hours`, or none when it is 0, and return how many were removed."""
+    if retention_hours <= 0:
+        return 0
+    
+    def prune(conn: sqlite3.Connection) -> int:
+        # seq and changed_at grow together, so the newest expired row ends the range to prune; one index seek
+        row = conn.execute("""
+            SELECT seq FROM changes
+            WHERE changed_at < strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?)
+            ORDER BY changed_at DESC, seq DESC
+            LIMIT 1
+        """, (f"-{retention_hours} hours",)).fetchone()
+        pruned_through = conn.execute("SELECT pruned_through FROM change_log_state WHERE id = 1").fetchone()[0]
+        if row is None or row[0] <= pruned_through:
+            return 0
+        through = row[0]
+        deleted = conn.execute("DELETE FROM changes WHERE seq <= ?", (through,)).rowcount
+        conn.execute("UPDATE change_log_state SET pruned_through = ? WHERE id = 1", (through,))
         return deleted
+    
+    return run_write(prune)
@@ -0,0 +1,195 @@
+"""
+Reusable SQLite connection pool for the SNS API.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from query_log import InstrumentedConnection
+
+
+DB_POOL_SIZE = int(os.environ.get("SNS_DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("SNS_DB_POOL_TIMEOUT", "10"))
+DB_BUSY_TIMEOUT = float(os.environ.get("SNS_DB_BUSY_TIMEOUT", "5"))
+DB_MMAP_SIZE = int(os.environ.get("SNS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.environ.get("SNS_DB_CACHE_SIZE_KB", "16384"))
+DB_HEALTH_CHECK_INTERVAL = float(os.environ.get("SNS_DB_HEALTH_CHECK_INTERVAL", "30"))
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+def connect(database: str) -> sqlite3.Connection:
+    """Open a connection with the per-connection pragmas every SNS API connection uses."""
+    conn = sqlite3.connect(database, timeout=DB_BUSY_TIMEOUT, check_same_thread=False, factory=InstrumentedConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    return conn
+
+
+class ConnectionPool:
+    """A bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to `size`, configured once when they are
+    opened (including the optional `on_connect` hook), and handed back out
+    most-recently-used first. A connection that has been idle longer than
+    `health_check_interval` seconds is pinged before reuse and replaced if the
+    ping fails.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        size: int = DB_POOL_SIZE,
+        timeout: float = DB_POOL_TIMEOUT,
+        health_check_interval: float = DB_HEALTH_CHECK_INTERVAL,
+        on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "health_check_failures": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        conn = connect(self.database)
+        if self.on_connect:
+            self.on_connect(conn)
+        with self._lock:
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection and free its slot in the pool."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._stats["connections_discarded"] += 1
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Ping a connection with a trivial query."""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if there is room."""
+        if self._closed:
+            raise PoolTimeoutError("Connection pool is closed")
+
+        while True:
+            try:
+                conn, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_or_wait()
+                released_at = None
+
+            if released_at is not None and time.monotonic() - released_at > self.health_check_interval:
+                if not self._is_healthy(conn):
+                    self._discard(conn)
+                    continue
+
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._in_use += 1
+            return conn
+
+    def _open_or_wait(self) -> sqlite3.Connection:
+        """Open a new connection if below size, otherwise wait for one to be released."""
+        with self._lock:
+            can_open = self._open < self.size
+            if can_open:
+                self._open += 1
+            else:
+                self._stats["waits"] += 1
+
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
+
+        try:
+            conn, _ = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, rolling back any unfinished transaction."""
+        with self._lock:
+            self._in_use -= 1
+
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage counters for monitoring."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "open_connections": self._open,
+                "in_use": self._in_use,
+                "idle": self._open - self._in_use,
+                **self._stats,
+            }
+
+    def close(self):
+        """Close every idle connection; connections in use are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,163 @@
+"""
+In-process publish/subscribe for live change events.
+
+Writes in database.py are published to an EventBus, which fans each event out
+to every subscriber's bounded queue on the event loop. The event is encoded
+as a Server-Sent Events message once and the same bytes are shared by all
+subscribers, so an idle subscriber costs one small queue and never touches
+the database. A subscriber whose queue fills up is dropped instead of
+buffering without limit or slowing down everyone else.
+"""
+import asyncio
+import os
+import threading
+from typing import AsyncIterator, Optional, Set
+
+from fast_json import dumps
+
+
+STREAM_QUEUE_SIZE = int(os.environ.get("SNS_STREAM_QUEUE_SIZE", "256"))
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get("SNS_STREAM_HEARTBEAT_INTERVAL", "15"))
+STREAM_MAX_SUBSCRIBERS = int(os.environ.get("SNS_STREAM_MAX_SUBSCRIBERS", "50000"))
+
+HEARTBEAT = b": keepalive\n\n"
+_DROPPED = b"event: dropped\ndata: {\"reason\":\"slow consumer\"}\n\n"
+_CLOSED = b""
+
+
+class TooManySubscribersError(RuntimeError):
+    """Raised when the bus already has STREAM_MAX_SUBSCRIBERS subscribers."""
+
+
+def format_event(event_id: int, event_type: str, data: dict) -> bytes:
+    """Encode an event as a Server-Sent Events message."""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode("utf-8"), dumps(data))
+
+
+class Subscription:
+    __slots__ = ("queue",)
+
+    def __init__(self, max_queue: int):
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(max_queue)
+
+
+class EventBus:
+    """Fans out published events to subscribers on one event loop.
+
+    publish() may be called from any thread; delivery always happens on the
+    loop the bus was bound to, so subscriber queues are never shared across
+    threads.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = STREAM_QUEUE_SIZE,
+        max_subscribers: int = STREAM_MAX_SUBSCRIBERS,
+        heartbeat_interval: float = STREAM_HEARTBEAT_INTERVAL,
+    ):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.heartbeat_interval = heartbeat_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._subscribers: Set[Subscription] = set()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "published": 0,
+            "delivered": 0,
+            "dropped_subscribers": 0,
+        }
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Deliver events on `loop` and start heartbeats; call once at startup from that loop."""
+        self._loop = loop
+        self._heartbeat_task = loop.create_task(self._send_heartbeats())
+
+    async def _send_heartbeats(self):
+        # One timer for every subscriber keeps idle connections open without a wake-up per stream
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for subscription in list(self._subscribers):
+                if not subscription.queue.full():
+                    subscription.queue.put_nowait(HEARTBEAT)
+
+    def publish(self, event_type: str, data: dict):
+        """Publish an event to every current subscriber. Thread-safe."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        with self._lock:
+            self._next_id += 1
+            event_id = self._next_id
+            self._stats["published"] += 1
+        if self._subscribers:
+            loop.call_soon_threadsafe(self._fan_out, format_event(event_id, event_type, data))
+
+    def _fan_out(self, message: bytes):
+        delivered = 0
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        with self._lock:
+            self._stats["delivered"] += delivered
+
+    def _drop(self, subscription: Subscription):
+        """Disconnect a subscriber that fell a full queue behind."""
+        self._subscribers.discard(subscription)
+        _replace_queue_contents(subscription.queue, _DROPPED)
+        with self._lock:
+            self._stats["dropped_subscribers"] += 1
+
+    def subscribe(self) -> Subscription:
+        """Register a new subscriber; must be called on the bus's event loop."""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribersError(f"Stream is limited to {self.max_subscribers} subscribers")
+        subscription = Subscription(self.max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """Yield SSE messages for a subscription until it is dropped or the bus is closed."""
+        try:
+            while True:
+                message = await subscription.queue.get()
+                if message is _CLOSED:
+                    return
+                yield message
+                if message is _DROPPED:
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    def close(self):
+        """End every open stream, e.g. on shutdown; must be called on the bus's event loop."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for subscription in list(self._subscribers):
+            self._subscribers.discard(subscription)
+            _replace_queue_contents(subscription.queue, _CLOSED)
+
+    def stats(self) -> dict:
+        """Snapshot of subscriber and delivery counters for monitoring."""
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "max_subscribers": self.max_subscribers,
+                "queue_size": self.max_queue,
+                **self._stats,
+            }
+
+
+def _replace_queue_contents(queue: "asyncio.Queue[bytes]", final_message: bytes):
+    """Discard undelivered messages and leave only `final_message` for the consumer."""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(final_message)
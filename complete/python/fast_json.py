@@ -0,0 +1,32 @@
+"""
+Fast JSON encoding for list endpoints.
+
+Uses orjson when it is installed and falls back to the standard library.
+Rows passed here come straight from the database in the API's schema shape;
+they were validated by the request models when written, so they are encoded
+without building Pydantic models first.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that encodes plain dicts/lists without re-validating them."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
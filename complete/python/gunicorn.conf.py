@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for running the SNS API with uvicorn workers.
+
+Usage (requires `pip install gunicorn`):
+    gunicorn -c gunicorn.conf.py main:app
+"""
+import os
+
+# Workers share sns_api.db, so each one follows the others' writes. Set before
+# on_starting imports database.py, because forked workers inherit that module.
+os.environ.setdefault("SNS_WATCH_CHANGES", "1")
+
+bind = f"{os.environ.get('SNS_HOST', '0.0.0.0')}:{os.environ.get('SNS_PORT', '8000')}"
+workers = int(os.environ.get("SNS_WORKERS", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = 5
+
+
+def on_starting(server):
+    """Apply migrations once in the master, before any worker imports the app."""
+    from database import init_database
+    init_database()
@@ -0,0 +1,238 @@
+"""
+In-memory mirror of the most recent posts for read-heavy deployments.
+
+When SNS_HOT_SET_SIZE is set, the newest N posts and their counters are
+kept in memory and `/api/posts` (newest first) and `/api/posts/{post_id}`
+are answered without touching SQLite. Older posts, other sort orders and
+per-user feeds fall back to the database.
+
+The mirror is loaded once at startup. After that, database.py re-reads
+the post behind every change event (including, with SNS_WATCH_CHANGES,
+the events of other worker processes) and hands the row to `refresh()`.
+Those reads are serialized, so each is at least as new as the one before
+it, and events delivered out of commit order still leave the newest state.
+It always holds every post at least as new as its oldest record, which is
+what lets a feed page be served from it: a page that would reach past the
+oldest record is read from SQLite instead.
+
+Memory: each post costs one PostRecord (__slots__, no per-instance dict),
+its id, content and timestamp strings, and a dict and list slot.
+Usernames are interned, so each distinct author is stored once, and a post
+that was never edited shares one string for created_at and updated_at.
+That comes to about 340 bytes plus the length of the content for ASCII
+text (see `memory_usage()`, reported under /health), so 100,000 posts of
+100 characters take roughly 45 MB.
+"""
+import os
+import sys
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+HOT_SET_SIZE = int(os.environ.get("SNS_HOT_SET_SIZE", "0"))
+
+# Records inspected by memory_usage(); enough for a stable average
+MEMORY_SAMPLE_SIZE = 1000
+
+
+class PostRecord:
+    """One post and the counters that back its ETag, with no per-instance dict."""
+
+    __slots__ = (
+        "id", "username", "content", "created_at", "updated_at",
+        "likes_count", "comments_count", "comments_version",
+    )
+
+    def __init__(
+        self, id: str, username: str, content: str, created_at: str, updated_at: str,
+        likes_count: int = 0, comments_count: int = 0, comments_version: int = 0
+    ):
+        self.id = id
+        self.username = sys.intern(username)
+        self.content = content
+        self.created_at = created_at
+        # Most posts are never edited; share the string rather than store it twice
+        self.updated_at = created_at if updated_at == created_at else updated_at
+        self.likes_count = likes_count
+        self.comments_count = comments_count
+        self.comments_version = comments_version
+
+    def as_row(self) -> dict:
+        """The post as a plain dict shaped like the Post schema."""
+        return {
+            "id": self.id,
+            "username": self.username,
+            "content": self.content,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+            "likesCount": self.likes_count,
+            "commentsCount": self.comments_count,
+        }
+
+    def validators(self) -> dict:
+        """The columns database.get_post_validators() reads."""
+        return {
+            "updated_at": self.updated_at,
+            "likes_count": self.likes_count,
+            "comments_count": self.comments_count,
+            "comments_version": self.comments_version,
+        }
+
+
+def sort_key(record: PostRecord) -> Tuple[str, str]:
+    """Position of a post in the newest-first feed, the same (created_at, id) the feed cursor holds."""
+    return record.created_at, record.id
+
+
+class HotSet:
+    """A thread-safe, bounded mirror of the newest posts, ordered by (created_at, id).
+
+    A `capacity` of 0 disables it. Until `load()` is called every lookup
+    misses, so callers always have to be able to fall back to the database.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._records: Dict[str, PostRecord] = {}
+        # Oldest first, so new posts are appended and evictions pop the front
+        self._order: List[PostRecord] = []
+        # True when the mirror holds every post in the database, not just the newest
+        self._complete = False
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "changes": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def __contains__(self, post_id: str) -> bool:
+        with self._lock:
+            return post_id in self._records
+
+    def load(self, rows: Iterable[tuple]):
+        """Replace the contents with `rows`, newest first, as read by database.load_hot_set().
+
+        Each row holds the PostRecord fields in order. Pass up to capacity + 1
+        rows: receiving no more than capacity means the database has no other
+        posts.
+        """
+        records = [PostRecord(*row) for row in rows]
+        complete = len(records) <= self.capacity
+        records = records[:self.capacity]
+        records.reverse()
+        with self._lock:
+            self._records = {record.id: record for record in records}
+            self._order = records
+            self._complete = complete
+            self._loaded = True
+
+    def get_row(self, post_id: str) -> Optional[dict]:
+        """Return the post shaped like the Post schema, or None if it is not in memory."""
+        with self._lock:
+            record = self._records.get(post_id)
+            if record is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return record.as_row()
+
+    def get_validators(self, post_id: str) -> Optional[dict]:
+        """Return the post's ETag validators, or None if it is not in memory."""
+        with self._lock:
+            record = self._records.get(post_id)
+            return record.validators() if record is not None else None
+
+    def page(self, count: int, before: Optional[Tuple[str, str]] = None) -> Optional[List[dict]]:
+        """Return up to `count` posts older than the (created_at, id) key `before`, newest first.
+
+        Returns None when the page would reach past the oldest post in
+        memory, where posts the mirror does not hold may exist; the caller
+        reads that page from the database instead.
+        """
+        with self._lock:
+            if not self._loaded:
+                return None
+            end = bisect_left(self._order, before, key=sort_key) if before else len(self._order)
+            start = end - count
+            if start < 0 and not self._complete:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return [record.as_row() for record in reversed(self._order[max(start, 0):end])]
+
+    def refresh(self, post_id: str, row: Optional[tuple]):
+        """Mirror the post's row as read after a change, in PostRecord field order; None if it was deleted."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._stats["changes"] += 1
+            record = self._records.get(post_id)
+            if row is None:
+                if record is not None:
+                    self._remove(record)
+                return
+            if record is None:
+                self._insert(PostRecord(*row))
+                return
+            # created_at never changes, so the record keeps its place
+            index = bisect_left(self._order, sort_key(record), key=sort_key)
+            self._order[index] = self._records[post_id] = PostRecord(*row)
+
+    def _insert(self, record: PostRecord):
+        if record.id in self._records:
+            return
+        key = sort_key(record)
+        if self._order and key < sort_key(self._order[0]) and not self._complete:
+            # Older than everything held; posts between it and the oldest record may be missing
+            return
+        index = bisect_left(self._order, key, key=sort_key)
+        self._order.insert(index, record)
+        self._records[record.id] = record
+        if len(self._order) > self.capacity:
+            evicted = self._order.pop(0)
+            del self._records[evicted.id]
+            self._complete = False
+            self._stats["evictions"] += 1
+
+    def _remove(self, record: PostRecord):
+        del self._records[record.id]
+        index = bisect_left(self._order, sort_key(record), key=sort_key)
+        del self._order[index]
+
+    def memory_usage(self) -> dict:
+        """Estimate the bytes held per post from a sample of the records."""
+        with self._lock:
+            count = len(self._order)
+            step = max(1, count // MEMORY_SAMPLE_SIZE)
+            sample = self._order[::step]
+            usernames = {id(record.username): record.username for record in self._order}
+            containers = sys.getsizeof(self._records) + sys.getsizeof(self._order)
+        if not sample:
+            return {"posts": 0, "bytes_per_post": 0, "content_bytes_per_post": 0, "total_bytes": 0}
+
+        content = sum(sys.getsizeof(record.content) for record in sample) / len(sample)
+        other = sum(
+            sys.getsizeof(record) + sys.getsizeof(record.id) + sys.getsizeof(record.created_at)
+            + (sys.getsizeof(record.updated_at) if record.updated_at is not record.created_at else 0)
+            for record in sample
+        ) / len(sample)
+        other += (containers + sum(sys.getsizeof(name) for name in usernames.values())) / count
+        return {
+            "posts": count,
+            "bytes_per_post": round(other + content),
+            "content_bytes_per_post": round(content),
+            "total_bytes": round((other + content) * count),
+        }
+
+    def stats(self) -> dict:
+        """Return size and hit statistics for monitoring."""
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "size": len(self._order),
+                "complete": self._complete,
+                "oldest": self._order[0].created_at if self._order else None,
+                **self._stats,
+            }
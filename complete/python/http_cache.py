@@ -0,0 +1,66 @@
+"""
+HTTP caching helpers: pre-encoded documents, ETags and conditional responses.
+"""
+import hashlib
+from typing import Dict, NamedTuple
+
+from fastapi import Request, Response
+
+from compression import AVAILABLE_ENCODINGS, compress, encoded_etag, negotiate_encoding, strip_encoding
+
+
+class CachedDocument(NamedTuple):
+    body: bytes
+    # Pre-compressed bodies by content-coding, most preferred first
+    encoded: Dict[str, bytes]
+    etag: str
+    media_type: str
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def build_document(body: bytes, media_type: str = "application/json") -> CachedDocument:
+    """Pre-compute every available encoding, at its highest level, and the ETag of a body that rarely changes."""
+    return CachedDocument(
+        body=body,
+        encoded={encoding: compress(body, encoding, best=True) for encoding in AVAILABLE_ENCODINGS},
+        etag=make_etag(body),
+        media_type=media_type,
+    )
+
+
+def etag_matches(request: Request, *etags: str) -> bool:
+    """Whether If-None-Match matches any of the given ETags (weak comparison, any content-coding)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {strip_encoding(tag.strip().removeprefix("W/")) for tag in header.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def not_modified(etag: str, headers: dict = None) -> Response:
+    """Build a 304 response carrying the validator."""
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
+
+
+def document_response(request: Request, document: CachedDocument, cache_control: str = "no-cache") -> Response:
+    """Serve a pre-encoded document, answering 304 when the client copy is current."""
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), list(document.encoded))
+    etag = encoded_etag(document.etag, encoding) if encoding else document.etag
+
+    if etag_matches(request, document.etag):
+        return not_modified(etag, headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(content=document.encoded[encoding], media_type=document.media_type, headers={"ETag": etag, **headers})
+    return Response(content=document.body, media_type=document.media_type, headers={"ETag": etag, **headers})
@@ -4,41 +4,124 @@ Simple Social Media API - FastAPI Backend
 A basic Social Networking Service (SNS) API that allows users to create, retrieve, 
 update, and delete posts; add comments; and like/unlike posts.
 """
-from typing import List
+from typing import Any, List, Optional, Tuple, Type
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Query
+from datetime import datetime
+from fastapi import Body, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import yaml
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+import asyncio
+import json
+import logging
 import os
+import secrets
+from pydantic import BaseModel, ValidationError
 
 from models import (
     Post, Comment, NewPostRequest, UpdatePostRequest, 
-    NewCommentRequest, UpdateCommentRequest, LikeRequest, LikeResponse, Error
+    NewCommentRequest, UpdateCommentRequest, LikeRequest, LikeResponse, Error,
+    BatchItemResult, BatchResponse, SearchResult, ChangesResponse
 )
 from database import (
-    init_database, get_all_posts, create_post, get_post_by_id, 
-    update_post, delete_post, get_comments_by_post_id, create_comment,
-    get_comment_by_id, update_comment, delete_comment, add_like, remove_like
+    init_database, close_pool, close_write_queue, get_pool_stats, get_write_queue_stats,
+    get_cache_stats, get_hot_set_stats, load_hot_set, iter_posts_for_export, add_change_listener, remove_change_listener,
+    start_change_watcher, stop_change_watcher, get_change_watcher_stats, PostNotFoundError,
+    ChangesUnavailableError, CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, CHANGE_PRUNE_INTERVAL,
 )
+from async_database import (
+    get_all_posts, get_all_posts_rows, create_post, get_post_by_id, get_post_validators,
+    update_post, delete_post, get_comments_by_post_id, get_comments_rows_by_post_id, create_comment,
+    get_comment_by_id, update_comment, delete_comment, add_like, remove_like,
+    create_posts_batch, create_comments_batch, add_likes_batch, get_likes_rows_by_username, search_content,
+    refresh_trending_scores, get_changes_since, prune_changes, shutdown_executor
+)
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from http_cache import CachedDocument, build_document, document_response, etag_matches, make_etag, not_modified
+from fast_json import FastJSONResponse, dumps as fast_json_dumps
+from compression import CompressionMiddleware, stats as get_compression_stats
+from events import EventBus, TooManySubscribersError
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, record_error, registry as metrics_registry,
+    db_pool_connections, stream_subscribers,
+)
+from profiling import MAX_PROFILE_REQUESTS, ProfileInProgressError, ProfileSession, ProfilingMiddleware
+import query_log
+from ranking import TRENDING_REFRESH_INTERVAL
 
 
-# Load OpenAPI specification
-def load_openapi_spec():
-    """Load the OpenAPI specification from file."""
-    try:
-        with open("openapi.yaml", "r") as f:
-            return yaml.safe_load(f)
-    except FileNotFoundError:
-        return None
+MAX_BATCH_SIZE = 500
+
+# Opt-in: list endpoints encode database rows directly instead of building and re-validating models
+FAST_JSON = os.environ.get("SNS_FAST_JSON", "").lower() in ("1", "true", "yes")
+
+# Bearer token for /api/admin endpoints; they are disabled when unset
+ADMIN_TOKEN = os.environ.get("SNS_ADMIN_TOKEN", "")
+
+
+# The generated schema only changes with the routes, so it is encoded and compressed once
+_openapi_document: Optional[CachedDocument] = None
+
+
+def get_openapi_document() -> CachedDocument:
+    """Return the pre-encoded OpenAPI schema generated from the app's routes."""
+    global _openapi_document
+    if _openapi_document is None:
+        body = json.dumps(jsonable_encoder(app.openapi()), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        _openapi_document = build_document(body)
+    return _openapi_document
+
+
+logger = logging.getLogger(__name__)
+
+# Live change events for /api/stream
+event_bus = EventBus()
+
+# Armed through /api/admin/profile
+profile_session = ProfileSession()
+
+
+async def refresh_rankings_periodically():
+    """Keep stored trending scores decayed to the present; with several workers, one refresh per interval suffices."""
+    while True:
+        await asyncio.sleep(TRENDING_REFRESH_INTERVAL)
+        try:
+            await refresh_trending_scores(min_interval=TRENDING_REFRESH_INTERVAL / 2)
+        except Exception:
+            logger.exception("Refreshing trending scores failed")
+
+
+async def prune_changes_periodically():
+    """Drop change rows past their retention; with several workers, the extra runs find nothing to prune."""
+    while True:
+        await asyncio.sleep(CHANGE_PRUNE_INTERVAL)
+        try:
+            await prune_changes()
+        except Exception:
+            logger.exception("Pruning the change log failed")
 
 
 # Lifespan context manager for startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database when application starts."""
+    """Initialize database when application starts and release connections on shutdown."""
     init_database()
+    load_hot_set()
+    get_openapi_document()
+    event_bus.bind(asyncio.get_running_loop())
+    add_change_listener(event_bus.publish)
+    start_change_watcher()
+    ranking_refresher = asyncio.create_task(refresh_rankings_periodically())
+    change_pruner = asyncio.create_task(prune_changes_periodically())
     yield
+    change_pruner.cancel()
+    ranking_refresher.cancel()
+    stop_change_watcher()
+    remove_change_listener(event_bus.publish)
+    event_bus.close()
+    shutdown_executor()
+    close_write_queue()
+    close_pool()
 
 
 # Initialize FastAPI app
@@ -64,151 +147,333 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
+# Inside the metrics middleware, so request latency includes compression
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware, session=profile_session)
+
+
+def internal_error(e: Exception) -> HTTPException:
+    """Count an unexpected exception by type and turn it into a 500 response."""
+    record_error(e)
+    return HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+
+
+# FastAPI registers its own /openapi.json route first, which would shadow this cached one
+app.router.routes[:] = [route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url]
 
 
-# Custom OpenAPI endpoint
-@app.get("/openapi.json")
-async def get_openapi():
-    """Return the OpenAPI specification."""
-    openapi_spec = load_openapi_spec()
-    if openapi_spec:
-        # Update server URL to match our port
-        openapi_spec["servers"] = [{"url": "http://localhost:8000", "description": "Local development server"}]
-        return openapi_spec
-    return app.openapi()
+@app.get("/openapi.json", include_in_schema=False)
+async def get_openapi(request: Request):
+    """Return the OpenAPI schema generated from the app's routes."""
+    return document_response(request, get_openapi_document())
+
+
+# Health endpoint
+@app.get("/health", tags=["Health"])
+async def health():
+    """Report service health, database connection pool, cache, stream and compression statistics."""
+    return {
+        "status": "ok",
+        "database": {
+            "pool": get_pool_stats(),
+            "write_queue": get_write_queue_stats(),
+            "change_watcher": get_change_watcher_stats(),
+        },
+        "cache": {"posts": get_cache_stats(), "hot_set": get_hot_set_stats()},
+        "stream": event_bus.stats(),
+        "compression": get_compression_stats(),
+    }
+
+
+def collect_gauges():
+    """Refresh point-in-time gauges right before a scrape."""
+    pool = get_pool_stats()
+    db_pool_connections.set(pool["in_use"], ("in_use",))
+    db_pool_connections.set(pool["idle"], ("idle",))
+    stream_subscribers.set(event_bus.stats()["subscribers"])
+
+
+metrics_registry.add_collector(collect_gauges)
+
+
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Expose request, database and error metrics in the Prometheus text format."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 # Posts endpoints
+def set_next_page_headers(request: Request, response: Response, limit: int, next_cursor: Optional[str]):
+    """Advertise the next page of a keyset-paginated list via X-Next-Cursor and Link headers."""
+    if not next_cursor:
+        return
+    next_url = request.url.include_query_params(limit=limit, cursor=next_cursor)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+def post_etag(post_id: str, validators: dict) -> str:
+    """Strong ETag of a post: every field that can change is covered by updated_at or a counter."""
+    return make_etag("post", post_id, validators["updated_at"], validators["likes_count"], validators["comments_count"])
+
+
+def is_post_version(post: Post, validators: dict) -> bool:
+    """Whether `post` is the version `validators` describe, so their ETag may be sent with it."""
+    return (
+        post.likesCount == validators["likes_count"]
+        and post.commentsCount == validators["comments_count"]
+        and post.updatedAt == datetime.fromisoformat(validators["updated_at"])
+    )
+
+
+def comments_etag(post_id: str, validators: dict) -> str:
+    """Strong ETag of a post's comment list, bumped by triggers on every comment change."""
+    return make_etag("comments", post_id, validators["comments_version"])
+
+
 @app.get("/api/posts", response_model=List[Post], tags=["Posts"])
-async def get_posts():
+async def get_posts(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of posts to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    username: Optional[str] = Query(None, min_length=1, max_length=50, description="Only return posts by this user"),
+    sort: str = Query("recent", pattern="^(recent|top|trending)$", description="recent (newest first), top (most engagement) or trending (recent engagement)")
+):
     """List all posts - Retrieve all recent posts to browse what others are sharing."""
     try:
-        return get_all_posts()
+        if FAST_JSON:
+            rows, next_cursor = await get_all_posts_rows(limit=limit, cursor=cursor, username=username, sort=sort)
+            response = FastJSONResponse(rows)
+            set_next_page_headers(request, response, limit, next_cursor)
+            return response
+        posts, next_cursor = await get_all_posts(limit=limit, cursor=cursor, username=username, sort=sort)
+        set_next_page_headers(request, response, limit, next_cursor)
+        return posts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": "VALIDATION_ERROR", "message": str(e)})
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.post("/api/posts", response_model=Post, status_code=201, tags=["Posts"])
 async def create_new_post(post_data: NewPostRequest):
     """Create a new post - Create a new post to share something with others."""
     try:
-        return create_post(post_data)
+        return await create_post(post_data)
+    except Exception as e:
+        raise internal_error(e)
+
+
+def validate_batch_items(items: List[Any], model: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], List[BatchItemResult]]:
+    """Validate each item of a batch request on its own.
+
+    Returns the (index, model) pairs that passed and a 400 result for each item that did not.
+    """
+    valid = []
+    failures = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            details = [f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()]
+            failures.append(BatchItemResult(
+                index=index,
+                status=400,
+                error=Error(error="VALIDATION_ERROR", message="The item is invalid", details=details)
+            ))
+    return valid, failures
+
+
+def batch_response(results: List[BatchItemResult]) -> BatchResponse:
+    """Assemble a batch response with results in request order."""
+    results = sorted(results, key=lambda result: result.index)
+    succeeded = sum(1 for result in results if result.error is None)
+    return BatchResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+@app.post("/api/posts:batch", response_model=BatchResponse[Post], tags=["Posts"])
+async def create_posts_batch_endpoint(items: List[Any] = Body(..., max_length=MAX_BATCH_SIZE)):
+    """Create posts in bulk - Create up to 500 posts in one transaction, with a result per item."""
+    try:
+        valid, results = validate_batch_items(items, NewPostRequest)
+        posts = await create_posts_batch([post_data for _, post_data in valid])
+        for (index, _), post in zip(valid, posts):
+            results.append(BatchItemResult(index=index, status=201, data=post))
+        return batch_response(results)
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
+
+
+@app.get("/api/posts/export", tags=["Posts"])
+async def export_posts(
+    format: str = Query("ndjson", pattern="^ndjson$", description="Export format; only ndjson is supported"),
+    include_comments: bool = Query(False, description="Embed each post's comments"),
+    include_likes: bool = Query(False, description="Embed each post's likes")
+):
+    """Export all posts - Stream every post as newline-delimited JSON for bulk consumers."""
+    def generate_lines():
+        for batch in iter_posts_for_export(include_comments=include_comments, include_likes=include_likes):
+            yield b"".join(fast_json_dumps(row) + b"\n" for row in batch)
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
 
 
 @app.get("/api/posts/{post_id}", response_model=Post, tags=["Posts"])
-async def get_post_by_id_endpoint(post_id: str):
+async def get_post_by_id_endpoint(request: Request, response: Response, post_id: str):
     """Get a specific post - Retrieve a specific post by its ID to read in detail."""
     try:
-        post = get_post_by_id(post_id)
+        validators = await get_post_validators(post_id)
+        if not validators:
+            raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
+        etag = post_etag(post_id, validators)
+        if etag_matches(request, etag):
+            return not_modified(etag, {"Cache-Control": "no-cache"})
+        
+        post = await get_post_by_id(post_id)
+        if post and not is_post_version(post, validators):
+            # The cached copy predates a write it has not been invalidated for yet; read the row itself
+            post = await get_post_by_id(post_id, cached=False)
         if not post:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
+        response.headers["Cache-Control"] = "no-cache"
+        # A write landing between the two reads leaves the body without a matching ETag; the client just refetches
+        if is_post_version(post, validators):
+            response.headers["ETag"] = etag
         return post
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.patch("/api/posts/{post_id}", response_model=Post, tags=["Posts"])
 async def update_post_endpoint(post_id: str, post_data: UpdatePostRequest):
     """Update a post - Update an existing post if you made a mistake or have something to add."""
     try:
-        updated_post = update_post(post_id, post_data)
+        updated_post = await update_post(post_id, post_data)
         if not updated_post:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found or you don't have permission to update it"})
         return updated_post
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.delete("/api/posts/{post_id}", status_code=204, tags=["Posts"])
 async def delete_post_endpoint(post_id: str):
     """Delete a post - Delete a post if you no longer want it shared."""
     try:
-        deleted = delete_post(post_id)
+        deleted = await delete_post(post_id)
         if not deleted:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
         return JSONResponse(status_code=204, content=None)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 # Comments endpoints
 @app.get("/api/posts/{post_id}/comments", response_model=List[Comment], tags=["Comments"])
-async def get_comments_by_post_id_endpoint(post_id: str):
+async def get_comments_by_post_id_endpoint(request: Request, response: Response, post_id: str):
     """List comments for a post - Retrieve all comments on a specific post."""
     try:
         # Check if post exists
-        if not get_post_by_id(post_id):
+        validators = await get_post_validators(post_id)
+        if not validators:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
-        return get_comments_by_post_id(post_id)
+        etag = comments_etag(post_id, validators)
+        if etag_matches(request, etag):
+            return not_modified(etag, {"Cache-Control": "no-cache"})
+        
+        if FAST_JSON:
+            rows = await get_comments_rows_by_post_id(post_id)
+            return FastJSONResponse(rows, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        comments = await get_comments_by_post_id(post_id)
+        response.headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        return comments
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.post("/api/posts/{post_id}/comments", response_model=Comment, status_code=201, tags=["Comments"])
 async def create_comment_endpoint(post_id: str, comment_data: NewCommentRequest):
     """Create a comment - Add a comment to a post to share your thoughts."""
     try:
-        comment = create_comment(post_id, comment_data)
+        comment = await create_comment(post_id, comment_data)
         if not comment:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
         return comment
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.get("/api/posts/{post_id}/comments/{comment_id}", response_model=Comment, tags=["Comments"])
 async def get_comment_by_id_endpoint(post_id: str, comment_id: str):
     """Get a specific comment - Retrieve a specific comment by its ID."""
     try:
-        comment = get_comment_by_id(post_id, comment_id)
+        comment = await get_comment_by_id(post_id, comment_id)
         if not comment:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Comment not found"})
         return comment
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.patch("/api/posts/{post_id}/comments/{comment_id}", response_model=Comment, tags=["Comments"])
 async def update_comment_endpoint(post_id: str, comment_id: str, comment_data: UpdateCommentRequest):
     """Update a comment - Update an existing comment to correct or revise it."""
     try:
-        updated_comment = update_comment(post_id, comment_id, comment_data)
+        updated_comment = await update_comment(post_id, comment_id, comment_data)
         if not updated_comment:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Comment not found or you don't have permission to update it"})
         return updated_comment
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
 
 
 @app.delete("/api/posts/{post_id}/comments/{comment_id}", status_code=204, tags=["Comments"])
 async def delete_comment_endpoint(post_id: str, comment_id: str):
     """Delete a comment - Delete a comment if necessary."""
     try:
-        deleted = delete_comment(post_id, comment_id)
+        deleted = await delete_comment(post_id, comment_id)
         if not deleted:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Comment not found"})
         return JSONResponse(status_code=204, content=None)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
+
+
+@app.post("/api/posts/{post_id}/comments:batch", response_model=BatchResponse[Comment], tags=["Comments"])
+async def create_comments_batch_endpoint(post_id: str, items: List[Any] = Body(..., max_length=MAX_BATCH_SIZE)):
+    """Create comments in bulk - Add up to 500 comments to a post in one transaction, with a result per item."""
+    try:
+        valid, results = validate_batch_items(items, NewCommentRequest)
+        comments = await create_comments_batch(post_id, [comment_data for _, comment_data in valid])
+        if comments is None:
+            raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
+        for (index, _), comment in zip(valid, comments):
+            results.append(BatchItemResult(index=index, status=201, data=comment))
+        return batch_response(results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error(e)
 
 
 # Likes endpoints
@@ -216,13 +481,12 @@ async def delete_comment_endpoint(post_id: str, comment_id: str):
 async def like_post_endpoint(post_id: str, like_data: LikeRequest):
     """Like a post - Like a post to show appreciation."""
     try:
-        liked_at = add_like(post_id, like_data.username)
+        try:
+            liked_at = await add_like(post_id, like_data.username)
+        except PostNotFoundError:
+            raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
         if liked_at is None:
-            # Check if post exists
-            if not get_post_by_id(post_id):
-                raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
-            else:
-                raise HTTPException(status_code=400, detail={"error": "VALIDATION_ERROR", "message": "Post already liked by this user"})
+            raise HTTPException(status_code=400, detail={"error": "VALIDATION_ERROR", "message": "Post already liked by this user"})
         
         return LikeResponse(
             postId=post_id,
@@ -232,23 +496,200 @@ async def like_post_endpoint(post_id: str, like_data: LikeRequest):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
+
+
+@app.post("/api/posts/{post_id}/likes:batch", response_model=BatchResponse[LikeResponse], tags=["Likes"])
+async def like_post_batch_endpoint(post_id: str, items: List[Any] = Body(..., max_length=MAX_BATCH_SIZE)):
+    """Like a post in bulk - Add likes from up to 500 users in one transaction, with a result per item."""
+    try:
+        valid, results = validate_batch_items(items, LikeRequest)
+        liked_ats = await add_likes_batch(post_id, [like_data.username for _, like_data in valid])
+        if liked_ats is None:
+            raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Post not found"})
+        for (index, like_data), liked_at in zip(valid, liked_ats):
+            if liked_at is None:
+                results.append(BatchItemResult(
+                    index=index,
+                    status=400,
+                    error=Error(error="VALIDATION_ERROR", message="Post already liked by this user")
+                ))
+                continue
+            results.append(BatchItemResult(
+                index=index,
+                status=201,
+                data=LikeResponse(postId=post_id, username=like_data.username, likedAt=liked_at)
+            ))
+        return batch_response(results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error(e)
 
 
 @app.delete("/api/posts/{post_id}/likes", status_code=204, tags=["Likes"])
 async def unlike_post_endpoint(post_id: str, username: str = Query(..., description="Username of the user removing the like")):
     """Unlike a post - Remove your like from a post if you change your mind."""
     try:
-        deleted = remove_like(post_id, username)
+        deleted = await remove_like(post_id, username)
         if not deleted:
             raise HTTPException(status_code=404, detail={"error": "NOT_FOUND", "message": "Like not found"})
         return JSONResponse(status_code=204, content=None)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail={"error": "INTERNAL_SERVER_ERROR", "message": str(e)})
+        raise internal_error(e)
+
+
+# Users endpoints
+@app.get("/api/users/{username}/posts", response_model=List[Post], tags=["Users"])
+async def get_user_posts_endpoint(
+    request: Request,
+    response: Response,
+    username: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of posts to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page")
+):
+    """List a user's posts - Retrieve the posts a user wrote, newest first."""
+    return await get_posts(request, response, limit=limit, cursor=cursor, username=username, sort="recent")
+
+
+@app.get("/api/users/{username}/likes", response_model=List[LikeResponse], tags=["Users"])
+async def get_user_likes_endpoint(
+    request: Request,
+    response: Response,
+    username: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of likes to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page")
+):
+    """List a user's likes - Retrieve the posts a user liked, most recent first."""
+    try:
+        rows, next_cursor = await get_likes_rows_by_username(username, limit=limit, cursor=cursor)
+        if FAST_JSON:
+            response = FastJSONResponse(rows)
+            set_next_page_headers(request, response, limit, next_cursor)
+            return response
+        set_next_page_headers(request, response, limit, next_cursor)
+        return rows
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail={"error": "VALIDATION_ERROR", "message": str(e)})
+    except Exception as e:
+        raise internal_error(e)
+
+
+# Stream endpoints
+@app.get("/api/stream", tags=["Stream"])
+async def stream_endpoint():
+    """Live feed - Receive new and changed posts, comments and likes as Server-Sent Events."""
+    try:
+        subscription = event_bus.subscribe()
+    except TooManySubscribersError as e:
+        raise HTTPException(status_code=503, detail={"error": "SERVICE_UNAVAILABLE", "message": str(e)})
+    return StreamingResponse(
+        event_bus.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Sync endpoints
+@app.get("/api/changes", response_model=ChangesResponse, tags=["Sync"])
+async def get_changes_endpoint(
+    since: int = Query(0, ge=0, description="nextSince of the previous response, or latestSeq noted before a full download"),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE, description="Maximum number of changes to read")
+):
+    """Changes since - Fetch the posts, comments and likes created, changed or deleted after a change number."""
+    try:
+        changes = await get_changes_since(since=since, limit=limit)
+        if FAST_JSON:
+            return FastJSONResponse(changes)
+        return changes
+    except ChangesUnavailableError as e:
+        raise HTTPException(status_code=410, detail={"error": "GONE", "message": str(e)})
+    except Exception as e:
+        raise internal_error(e)
+
+
+# Search endpoints
+@app.get("/api/search", response_model=List[SearchResult], tags=["Search"])
+async def search_endpoint(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to search for; results contain every word"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page")
+):
+    """Search posts and comments - Find posts and comments by their content, best matches first."""
+    try:
+        results, next_cursor = await search_content(q, limit=limit, cursor=cursor)
+        if FAST_JSON:
+            response = FastJSONResponse(results)
+            set_next_page_headers(request, response, limit, next_cursor)
+            return response
+        set_next_page_headers(request, response, limit, next_cursor)
+        return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": "VALIDATION_ERROR", "message": str(e)})
+    except Exception as e:
+        raise internal_error(e)
+
+
+# Admin endpoints
+def require_admin(request: Request):
+    """Reject the request unless it carries the SNS_ADMIN_TOKEN bearer token."""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if not ADMIN_TOKEN or scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail={"error": "FORBIDDEN", "message": "Admin access is not allowed"})
+
+
+@app.post("/api/admin/profile", status_code=202, tags=["Admin"])
+async def start_profile_endpoint(
+    request: Request,
+    requests: int = Query(100, ge=1, le=MAX_PROFILE_REQUESTS, description="Number of upcoming requests to profile")
+):
+    """Profile the next requests - Sample every thread while the next N requests are served."""
+    require_admin(request)
+    try:
+        return profile_session.arm(requests)
+    except ProfileInProgressError as e:
+        raise HTTPException(status_code=409, detail={"error": "CONFLICT", "message": str(e)})
+
+
+@app.get("/api/admin/profile", tags=["Admin"])
+async def get_profile_endpoint(request: Request):
+    """Get the profile - The finished report, or the progress of the one being collected."""
+    require_admin(request)
+    return profile_session.status()
+
+
+def slow_query_report() -> dict:
+    """Return the slow-query threshold, log file and recent slow queries, newest first."""
+    return {
+        "threshold_ms": query_log.threshold * 1000,
+        "log": query_log.SLOW_QUERY_LOG or None,
+        "queries": list(reversed(query_log.recent_slow_queries)),
+    }
+
+
+@app.get("/api/admin/slow-queries", tags=["Admin"])
+async def get_slow_queries_endpoint(request: Request):
+    """Recent slow queries - Statements slower than the threshold, with parameter shapes and query plans."""
+    require_admin(request)
+    return slow_query_report()
+
+
+@app.put("/api/admin/slow-queries", tags=["Admin"])
+async def set_slow_query_threshold_endpoint(
+    request: Request,
+    threshold_ms: float = Query(..., ge=0, description="New slow-query threshold for this process, in milliseconds")
+):
+    """Change the slow-query threshold - Takes effect immediately, until the process restarts."""
+    require_admin(request)
+    query_log.threshold = threshold_ms / 1000
+    return slow_query_report()
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from serve import main as serve
+    serve()
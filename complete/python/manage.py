@@ -0,0 +1,118 @@
+"""
+Maintenance commands for the SNS API database.
+
+Usage:
+    python manage.py migrate
+    python manage.py check-counters [--repair]
+    python manage.py check-plans
+    python manage.py rebuild-search
+    python manage.py rebuild-rankings
+    python manage.py prune-changes [--retention-hours 168]
+"""
+import argparse
+import sys
+
+from database import (
+    CHANGE_RETENTION_HOURS, init_database, check_post_counters, prune_changes, rebuild_search_index,
+    rebuild_trending_scores,
+)
+from query_plans import check_query_plans
+
+
+def check_counters_command(args: argparse.Namespace) -> int:
+    """Report (and optionally repair) posts whose like/comment counters drifted."""
+    init_database()
+    drifted = check_post_counters(repair=args.repair)
+    for row in drifted:
+        print(
+            f"{row['id']}: likes {row['likes_count']} -> {row['actual_likes']}, "
+            f"comments {row['comments_count']} -> {row['actual_comments']}"
+        )
+    
+    if not drifted:
+        print("All post counters are consistent.")
+        return 0
+    if args.repair:
+        print(f"Repaired {len(drifted)} post(s).")
+        return 0
+    print(f"{len(drifted)} post(s) have drifted counters. Re-run with --repair to fix them.")
+    return 1
+
+
+def migrate_command(args: argparse.Namespace) -> int:
+    """Apply pending schema migrations."""
+    applied = init_database()
+    for version in applied:
+        print(f"Applied migration {version}.")
+    if not applied:
+        print("Database schema is up to date.")
+    return 0
+
+
+def check_plans_command(args: argparse.Namespace) -> int:
+    """Fail when any query issued by database.py scans a whole table."""
+    violations = check_query_plans()
+    for violation in violations:
+        print(f"{violation.detail}\n    {violation.sql}")
+    
+    if violations:
+        print(f"{len(violations)} full table scan(s) found.")
+        return 1
+    print("No full table scans found.")
+    return 0
+
+
+def rebuild_search_command(args: argparse.Namespace) -> int:
+    """Rebuild the full-text search indexes from the posts and comments tables."""
+    init_database()
+    rebuild_search_index()
+    print("Search indexes rebuilt.")
+    return 0
+
+
+def rebuild_rankings_command(args: argparse.Namespace) -> int:
+    """Recompute every post's trending score from the posts, likes and comments tables."""
+    init_database()
+    trending = rebuild_trending_scores()
+    print(f"Trending scores rebuilt; {trending} posts trending.")
+    return 0
+
+
+def prune_changes_command(args: argparse.Namespace) -> int:
+    """Delete change rows older than the retention period."""
+    init_database()
+    deleted = prune_changes(args.retention_hours)
+    print(f"{deleted} changes pruned.")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="SNS API maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate.set_defaults(handler=migrate_command)
+    
+    check_counters = subparsers.add_parser("check-counters", help="Verify denormalized like/comment counters")
+    check_counters.add_argument("--repair", action="store_true", help="Recompute drifted counters")
+    check_counters.set_defaults(handler=check_counters_command)
+    
+    check_plans = subparsers.add_parser("check-plans", help="Assert no query in database.py does a full table scan")
+    check_plans.set_defaults(handler=check_plans_command)
+    
+    rebuild_search = subparsers.add_parser("rebuild-search", help="Rebuild the full-text search indexes")
+    rebuild_search.set_defaults(handler=rebuild_search_command)
+    
+    rebuild_rankings = subparsers.add_parser("rebuild-rankings", help="Recompute trending scores")
+    rebuild_rankings.set_defaults(handler=rebuild_rankings_command)
+    
+    prune = subparsers.add_parser("prune-changes", help="Delete change log rows past their retention")
+    prune.add_argument("--retention-hours", type=float, default=CHANGE_RETENTION_HOURS, help="Keep changes this recent")
+    prune.set_defaults(handler=prune_changes_command)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Prometheus-style metrics for the SNS API.
+
+A small, dependency-free implementation of counters, gauges and histograms
+rendered in the Prometheus text exposition format. Recording a sample is a
+dict lookup and a few additions under a lock, cheap enough to leave on
+under full load.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets: Iterable[float] = HTTP_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, list(state)) for labels, state in self._values.items())
+        lines = self.header()
+        for labels, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and renders them; collectors refresh gauges right before a scrape."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> bytes:
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "sns_http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "sns_http_request_duration_seconds", "HTTP request latency by route template and status", ("method", "route", "status")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "sns_http_requests_in_flight", "HTTP requests currently being served, including open streams"
+))
+http_errors_total = registry.register(Counter(
+    "sns_http_errors_total", "Requests that failed with a 500, by exception type", ("error_type",)
+))
+db_call_duration = registry.register(Histogram(
+    "sns_db_call_duration_seconds", "Time spent in each database.py function", ("function",), DB_BUCKETS
+))
+db_executor_wait = registry.register(Histogram(
+    "sns_db_executor_wait_seconds", "Time database calls waited for a database thread", (), DB_BUCKETS
+))
+db_rows_total = registry.register(Counter(
+    "sns_db_rows_returned_total", "Rows returned by each database.py function", ("function",)
+))
+db_errors_total = registry.register(Counter(
+    "sns_db_errors_total", "Exceptions raised by each database.py function", ("function", "error_type")
+))
+db_pool_connections = registry.register(Gauge(
+    "sns_db_pool_connections", "Pooled database connections by state", ("state",)
+))
+stream_subscribers = registry.register(Gauge(
+    "sns_stream_subscribers", "Open /api/stream connections"
+))
+
+
+def record_error(error: BaseException):
+    """Count a request that was turned into a 500."""
+    http_errors_total.inc((type(error).__name__,))
+
+
+def count_rows(result) -> int:
+    """Rows in a database.py result: a list, a (rows, cursor) page, a dict of lists, or a single object."""
+    if result is None or isinstance(result, bool):
+        return 0
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and all(isinstance(value, list) for value in result.values()):
+        return sum(len(value) for value in result.values())
+    return 1
+
+
+def timed_db_call(func: Callable) -> Callable:
+    """Wrap a database function to record its duration, rows returned and errors."""
+    name = func.__name__
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            db_errors_total.inc((name, type(e).__name__))
+            raise
+        finally:
+            db_call_duration.observe(time.perf_counter() - started, (name,))
+        db_rows_total.inc((name,), count_rows(result))
+        return result
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            status = 500
+            record_error(e)
+            raise
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            # Label by template, never the raw path, to keep the number of series bounded
+            labels = (scope["method"], getattr(route, "path", "unmatched"), str(status))
+            http_requests_total.inc(labels)
+            http_request_duration.observe(time.perf_counter() - started, labels)
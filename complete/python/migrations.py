@@ -0,0 +1,335 @@
+"""
+Versioned schema migrations for the SNS API database.
+
+Each migration has a unique, increasing version number and runs in its own
+transaction. Applied versions are recorded in the schema_version table, so
+init_database() only runs the migrations a database has not seen yet.
+"""
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from ranking import COMMENT_WEIGHT, LIKE_WEIGHT, recompute_trending_scores
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a function as the migration for `version`."""
+    def register(func: Callable[[sqlite3.Cursor], None]):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return register
+
+
+def get_table_columns(cursor: sqlite3.Cursor, table: str) -> set:
+    """Return the column names of a table, including generated columns."""
+    return {row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})")}
+
+
+@migration(1, "Create posts, comments and likes tables")
+def create_base_tables(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS posts (
+            id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS comments (
+            id TEXT PRIMARY KEY,
+            post_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS likes (
+            post_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            liked_at TEXT NOT NULL,
+            PRIMARY KEY (post_id, username),
+            FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE
+        )
+    """)
+
+
+@migration(2, "Index posts by (created_at, id) for keyset pagination")
+def add_posts_feed_index(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_posts_created_at_id
+        ON posts (created_at DESC, id DESC)
+    """)
+
+
+@migration(3, "Denormalize likes/comments counters onto posts")
+def add_post_counters(cursor: sqlite3.Cursor):
+    columns = get_table_columns(cursor, "posts")
+    if "likes_count" not in columns:
+        cursor.execute("ALTER TABLE posts ADD COLUMN likes_count INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes l WHERE l.post_id = posts.id)")
+    if "comments_count" not in columns:
+        cursor.execute("ALTER TABLE posts ADD COLUMN comments_count INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("UPDATE posts SET comments_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id)")
+
+    # Counters are maintained in the same transaction as the row change
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_likes_insert_count AFTER INSERT ON likes
+        BEGIN
+            UPDATE posts SET likes_count = likes_count + 1 WHERE id = NEW.post_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_likes_delete_count AFTER DELETE ON likes
+        BEGIN
+            UPDATE posts SET likes_count = likes_count - 1 WHERE id = OLD.post_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_comments_insert_count AFTER INSERT ON comments
+        BEGIN
+            UPDATE posts SET comments_count = comments_count + 1 WHERE id = NEW.post_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_comments_delete_count AFTER DELETE ON comments
+        BEGIN
+            UPDATE posts SET comments_count = comments_count - 1 WHERE id = OLD.post_id;
+        END
+    """)
+
+
+@migration(4, "Index comments by (post_id, created_at)")
+def add_comments_post_index(cursor: sqlite3.Cursor):
+    # likes needs no extra index: its (post_id, username) primary key already serves post_id lookups
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_comments_post_id_created_at
+        ON comments (post_id, created_at)
+    """)
+
+
+@migration(5, "Remove comments and likes orphaned before foreign keys were enforced")
+def remove_orphaned_rows(cursor: sqlite3.Cursor):
+    # Connections now enable PRAGMA foreign_keys, so deletes cascade from here on
+    cursor.execute("DELETE FROM comments WHERE post_id NOT IN (SELECT id FROM posts)")
+    cursor.execute("DELETE FROM likes WHERE post_id NOT IN (SELECT id FROM posts)")
+
+
+@migration(6, "Add FTS5 full-text indexes over post and comment content")
+def add_search_indexes(cursor: sqlite3.Cursor):
+    # External-content tables: the text lives only in posts/comments, FTS stores the index keyed by rowid
+    for table in ("posts", "comments"):
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                content, content='{table}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {table}_fts (rowid, content) VALUES (NEW.rowid, NEW.content);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF content ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+                INSERT INTO {table}_fts (rowid, content) VALUES (NEW.rowid, NEW.content);
+            END
+        """)
+        cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+@migration(7, "Index posts by author and likes by user for profile pages")
+def add_user_indexes(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_posts_username_created_at_id
+        ON posts (username, created_at DESC, id DESC)
+    """)
+    # Holds every column a user's likes page reads, so it is served from the index alone
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_likes_username_liked_at
+        ON likes (username, liked_at DESC, post_id DESC)
+    """)
+
+
+@migration(8, "Version each post's comment list for conditional requests")
+def add_comments_version(cursor: sqlite3.Cursor):
+    if "comments_version" not in get_table_columns(cursor, "posts"):
+        cursor.execute("ALTER TABLE posts ADD COLUMN comments_version INTEGER NOT NULL DEFAULT 0")
+    
+    # Any change to a post's comments bumps its version, so the list can be validated from the posts row alone
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_comments_{event.lower()}_version AFTER {event} ON comments
+            BEGIN
+                UPDATE posts SET comments_version = comments_version + 1 WHERE id = {row}.post_id;
+            END
+        """)
+
+
+POST_JSON = """json_object(
+    'id', NEW.id, 'username', NEW.username, 'content', NEW.content,
+    'createdAt', NEW.created_at, 'updatedAt', NEW.updated_at,
+    'likesCount', NEW.likes_count, 'commentsCount', NEW.comments_count
+)"""
+COMMENT_JSON = """json_object(
+    'id', NEW.id, 'postId', NEW.post_id, 'username', NEW.username, 'content', NEW.content,
+    'createdAt', NEW.created_at, 'updatedAt', NEW.updated_at
+)"""
+
+# (trigger name, trigger event, WHEN condition, event type, entity id, post id, JSON payload)
+CHANGE_TRIGGERS = [
+    ("trg_posts_insert_change", "INSERT ON posts", "", "post.created", "NEW.id", "NEW.id", POST_JSON),
+    ("trg_posts_update_change", "UPDATE OF content ON posts", "", "post.updated", "NEW.id", "NEW.id", POST_JSON),
+    ("trg_posts_delete_change", "DELETE ON posts", "", "post.deleted", "OLD.id", "OLD.id", "json_object('id', OLD.id)"),
+    ("trg_comments_insert_change", "INSERT ON comments", "", "comment.created", "NEW.id", "NEW.post_id", COMMENT_JSON),
+    ("trg_comments_update_change", "UPDATE OF content ON comments", "", "comment.updated", "NEW.id", "NEW.post_id", COMMENT_JSON),
+    # Children removed by a post delete cascade are implied by its post.deleted change
+    ("trg_comments_delete_change", "DELETE ON comments", "WHEN EXISTS (SELECT 1 FROM posts WHERE id = OLD.post_id)",
+     "comment.deleted", "OLD.id", "OLD.post_id", "json_object('id', OLD.id, 'postId', OLD.post_id)"),
+    ("trg_likes_insert_change", "INSERT ON likes", "", "like.added", "NEW.username", "NEW.post_id",
+     "json_object('postId', NEW.post_id, 'username', NEW.username, 'likedAt', NEW.liked_at)"),
+    ("trg_likes_delete_change", "DELETE ON likes", "WHEN EXISTS (SELECT 1 FROM posts WHERE id = OLD.post_id)",
+     "like.removed", "OLD.username", "OLD.post_id", "json_object('postId', OLD.post_id, 'username', OLD.username)"),
+]
+
+
+@migration(9, "Record every change in a changes table for cross-process consumers")
+def add_change_log(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            event TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            post_id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            origin TEXT,
+            changed_at TEXT NOT NULL
+        )
+    """)
+    for name, trigger_event, condition, event, entity_id, post_id, data in CHANGE_TRIGGERS:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {trigger_event} {condition}
+            BEGIN
+                INSERT INTO changes (event, entity_id, post_id, data, changed_at)
+                VALUES ('{event}', {entity_id}, {post_id}, {data}, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'));
+            END
+        """)
+
+
+@migration(10, "Rank posts by all-time engagement and by time-decayed trending score")
+def add_rankings(cursor: sqlite3.Cursor):
+    columns = get_table_columns(cursor, "posts")
+    if "top_score" not in columns:
+        # Follows likes_count and comments_count, which the counter triggers keep current
+        cursor.execute(f"""
+            ALTER TABLE posts ADD COLUMN top_score INTEGER
+            GENERATED ALWAYS AS ({LIKE_WEIGHT} * likes_count + {COMMENT_WEIGHT} * comments_count) VIRTUAL
+        """)
+    if "trending_score" not in columns:
+        cursor.execute("ALTER TABLE posts ADD COLUMN trending_score REAL NOT NULL DEFAULT 0")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_posts_top_score_id
+        ON posts (top_score DESC, id DESC)
+    """)
+    # Only posts that are still trending are indexed, so decayed posts cost nothing
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_posts_trending_score_id
+        ON posts (trending_score DESC, id DESC) WHERE trending_score > 0
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ranking_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            epoch REAL NOT NULL,
+            half_life_hours REAL NOT NULL
+        )
+    """)
+    recompute_trending_scores(cursor.connection, time.time())
+
+
+@migration(11, "Track how far the changes table has been pruned")
+def add_change_log_state(cursor: sqlite3.Cursor):
+    # A delta-sync client whose last seen change is older than pruned_through has missed some and must resync
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            pruned_through INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO change_log_state (id, pruned_through) VALUES (1, 0)")
+
+
+@migration(12, "Index the changes table by time for pruning")
+def index_changes_by_time(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_changes_changed_at
+        ON changes (changed_at)
+    """)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the highest migration version applied to the database."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """Apply every pending migration in order and return the versions applied.
+
+    Each migration runs under BEGIN IMMEDIATE, so concurrent processes starting
+    against the same database apply it exactly once.
+    """
+    applied = []
+    for m in MIGRATIONS:
+        if m.version <= get_schema_version(conn):
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if m.version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            m.apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (m.version, m.description, datetime.utcnow().isoformat() + "Z")
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(m.version)
+    return applied
@@ -2,11 +2,14 @@
 Pydantic models based on OpenAPI schema definitions.
 """
 from datetime import datetime
-from typing import List, Optional
+from typing import Generic, List, Literal, Optional, TypeVar
 from uuid import UUID
 from pydantic import BaseModel, Field
 
 
+T = TypeVar("T")
+
+
 # Request/Response Models
 class NewPostRequest(BaseModel):
     username: str = Field(..., min_length=1, max_length=50, description="Username of the post author")
@@ -57,7 +60,47 @@ class Comment(BaseModel):
     updatedAt: str = Field(..., description="Timestamp when the comment was last updated")
 
 
+class SearchResult(BaseModel):
+    type: Literal["post", "comment"] = Field(..., description="Whether the match is a post or a comment")
+    id: str = Field(..., description="ID of the matching post or comment")
+    postId: str = Field(..., description="ID of the post, or of the post the comment belongs to")
+    username: str = Field(..., description="Username of the author")
+    content: str = Field(..., description="Content of the post or comment")
+    createdAt: str = Field(..., description="Timestamp when the post or comment was created")
+    score: float = Field(..., description="Relevance score; higher is a better match")
+
+
+class DeletedItem(BaseModel):
+    type: Literal["post", "comment", "like"] = Field(..., description="Kind of item that no longer exists")
+    id: Optional[str] = Field(None, description="ID of the deleted post or comment; absent for likes")
+    postId: str = Field(..., description="ID of the post, or of the post the comment or like belonged to")
+    username: Optional[str] = Field(None, description="Username whose like was removed; only for likes")
+
+
+class ChangesResponse(BaseModel):
+    posts: List[Post] = Field(..., description="Current state of posts created or changed, including their counters")
+    comments: List[Comment] = Field(..., description="Current state of comments created or changed")
+    likes: List[LikeResponse] = Field(..., description="Likes added")
+    deleted: List[DeletedItem] = Field(..., description="Posts, comments and likes that no longer exist")
+    nextSince: int = Field(..., ge=0, description="Pass as `since` to continue after this page")
+    latestSeq: int = Field(..., ge=0, description="Number of the most recent change")
+    hasMore: bool = Field(..., description="Whether more changes follow nextSince")
+
+
 class Error(BaseModel):
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Error message")
     details: Optional[List[str]] = Field(None, description="Additional error details")
+
+
+class BatchItemResult(BaseModel, Generic[T]):
+    index: int = Field(..., description="Position of the item in the request array")
+    status: int = Field(..., description="HTTP status code for this item")
+    data: Optional[T] = Field(None, description="Created resource when the item succeeded")
+    error: Optional[Error] = Field(None, description="Error when the item failed")
+
+
+class BatchResponse(BaseModel, Generic[T]):
+    succeeded: int = Field(..., ge=0, description="Number of items that succeeded")
+    failed: int = Field(..., ge=0, description="Number of items that failed")
+    results: List[BatchItemResult[T]] = Field(..., description="Per-item results in request order")
@@ -0,0 +1,41 @@
+"""
+Opaque cursor helpers for keyset pagination.
+"""
+import base64
+import json
+from typing import Optional, Sequence, Tuple
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Types a cursor value may have; anything else could not be bound as a query parameter
+SCALAR_TYPES = (str, int, float)
+NUMBER_TYPES = (int, float)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, types: Optional[Sequence[Tuple[type, ...]]] = None) -> Tuple:
+    """Decode a cursor produced by encode_cursor into `size` scalars, each an instance of its entry in `types`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursorError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Invalid cursor")
+    for value, expected in zip(values, types or [SCALAR_TYPES] * size):
+        # bool is an int to isinstance, but no cursor is encoded with one
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise InvalidCursorError("Invalid cursor")
+    return tuple(values)
@@ -0,0 +1,233 @@
+"""
+On-demand sampling profiler for the SNS API.
+
+An admin arms a ProfileSession for the next N requests. While any of them is
+in flight, a background thread samples the stack of every thread in the
+process, so time spent in the database executor threads shows up next to
+the event loop. The report lists the hottest functions by self and total
+samples, plus collapsed stacks that flamegraph tools read directly.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+PROFILE_INTERVAL_MS = float(os.environ.get("SNS_PROFILE_INTERVAL_MS", "1"))
+MAX_PROFILE_REQUESTS = 1000
+TOP_FUNCTIONS = 50
+TOP_STACKS = 200
+
+# Long-lived or administrative requests that would hold a profile open or profile itself
+EXCLUDED_PATH_PREFIXES = ("/api/admin", "/api/stream")
+
+# Innermost frames of threads that are waiting for work rather than doing it
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+Frame = Tuple[str, int, str]
+
+
+class ProfileInProgressError(RuntimeError):
+    """Raised when a profile is requested while another one is still collecting."""
+
+
+def is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def format_frame(frame: Frame) -> str:
+    filename, lineno, name = frame
+    short = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    return f"{name} ({short}:{lineno})"
+
+
+class SamplingProfiler:
+    """Background thread that periodically records the stack of every busy thread."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sns-profiler", daemon=True)
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _thread_name(self, thread_id: int) -> str:
+        name = self._thread_names.get(thread_id)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.get(thread_id, str(thread_id))
+        return name
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                self._stacks[(self._thread_name(thread_id), tuple(stack))] += 1
+
+    def report(self) -> dict:
+        """Hottest functions by self and total samples, and collapsed stacks."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for (_, stack), count in self._stacks.items():
+            self_counts[stack[-1]] += count
+            for frame in set(stack):
+                total_counts[frame] += count
+
+        busy = sum(self._stacks.values()) or 1
+        top = [
+            {
+                "function": format_frame(frame),
+                "self": self_counts[frame],
+                "total": total,
+                "self_percent": round(100 * self_counts[frame] / busy, 2),
+                "total_percent": round(100 * total / busy, 2),
+            }
+            for frame, total in sorted(total_counts.items(), key=lambda item: (-self_counts[item[0]], -item[1]))[:TOP_FUNCTIONS]
+        ]
+        stacks = [
+            f"{thread};{';'.join(format_frame(frame) for frame in stack)} {count}"
+            for (thread, stack), count in self._stacks.most_common(TOP_STACKS)
+        ]
+        return {
+            "duration_ms": round(self._elapsed * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "busy_thread_samples": sum(self._stacks.values()),
+            "top": top,
+            "stacks": stacks,
+        }
+
+
+class ProfileSession:
+    """Profiles the next N requests, then keeps the report until the next session is armed."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._requested = 0
+        self._remaining = 0
+        self._in_flight = 0
+        self._profiler: Optional[SamplingProfiler] = None
+        self._requests: List[dict] = []
+        self._armed_at: Optional[str] = None
+        self._report: Optional[dict] = None
+
+    def arm(self, requests: int) -> dict:
+        """Profile the next `requests` requests, discarding any previous report."""
+        with self._lock:
+            if self._remaining or self._in_flight:
+                raise ProfileInProgressError("A profile is already being collected")
+            self._requested = self._remaining = requests
+            self._requests = []
+            self._report = None
+            self._armed_at = datetime.utcnow().isoformat() + "Z"
+        return self.status()
+
+    def begin_request(self) -> bool:
+        """Claim a slot for a request that is starting; False when no profile is armed."""
+        with self._lock:
+            if not self._remaining:
+                return False
+            self._remaining -= 1
+            self._in_flight += 1
+            if self._profiler is None:
+                self._profiler = SamplingProfiler(self.interval)
+                self._profiler.start()
+            return True
+
+    def end_request(self, method: str, path: str, status: int, elapsed: float):
+        """Record a profiled request; the last one to finish stops the profiler."""
+        with self._lock:
+            self._requests.append({
+                "method": method,
+                "path": path,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 3),
+            })
+            self._in_flight -= 1
+            if self._remaining or self._in_flight:
+                return
+            profiler, self._profiler = self._profiler, None
+            profiler.stop()
+            self._report = {
+                "status": "complete",
+                "armed_at": self._armed_at,
+                "requests": self._requests,
+                **profiler.report(),
+            }
+
+    def status(self) -> dict:
+        """The finished report, or the progress of the profile being collected."""
+        with self._lock:
+            if self._report is not None:
+                return self._report
+            if not self._requested:
+                return {"status": "idle"}
+            return {
+                "status": "collecting",
+                "armed_at": self._armed_at,
+                "requested": self._requested,
+                "remaining": self._remaining,
+                "in_flight": self._in_flight,
+            }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that feeds armed ProfileSession slots with incoming requests."""
+
+    def __init__(self, app, session: ProfileSession):
+        self.app = app
+        self.session = session
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(EXCLUDED_PATH_PREFIXES)
+            or not self.session.begin_request()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.session.end_request(scope["method"], scope["path"], status, time.perf_counter() - started)
@@ -0,0 +1,163 @@
+"""
+Slow-query log for the SNS API.
+
+Every connection opened by db_pool.connect() uses InstrumentedConnection,
+whose cursors time each statement from execute() through its last fetch.
+A statement slower than SNS_SLOW_QUERY_MS is kept in a short in-memory list
+for the admin API with the shapes (not the values) of its parameters and its
+EXPLAIN QUERY PLAN, and also written to a rotating log when
+SNS_SLOW_QUERY_LOG names a file.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+
+
+SLOW_QUERY_MS = float(os.environ.get("SNS_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG = os.environ.get("SNS_SLOW_QUERY_LOG", "")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get("SNS_SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get("SNS_SLOW_QUERY_LOG_BACKUPS", "5"))
+RECENT_SLOW_QUERIES = 100
+
+EXPLAINABLE_PREFIXES = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+# Seconds; adjustable at runtime through the admin API
+threshold = SLOW_QUERY_MS / 1000
+recent_slow_queries: "deque[dict]" = deque(maxlen=RECENT_SLOW_QUERIES)
+
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def get_logger() -> logging.Logger:
+    """Return the slow-query logger, attaching the rotating file handler on first use."""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger("sns.slow_queries")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if SLOW_QUERY_LOG:
+                handler = RotatingFileHandler(
+                    SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+def describe_value(value) -> str:
+    """Shape of a bound parameter: its type, and its length for strings and blobs."""
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shapes(parameters) -> object:
+    """Describe bound parameters without logging user data."""
+    if isinstance(parameters, dict):
+        return {name: describe_value(value) for name, value in parameters.items()}
+    return [describe_value(value) for value in parameters]
+
+
+def explain(conn: sqlite3.Connection, sql: str, parameters) -> List[str]:
+    """EXPLAIN QUERY PLAN for a statement, or an empty list when it cannot be explained."""
+    if not sql.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+        return []
+    try:
+        # A plain cursor, so explaining is never itself timed and logged
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[3] for row in rows]
+
+
+def record_slow_query(conn: sqlite3.Connection, sql: str, parameters, elapsed: float, executemany_count: Optional[int] = None):
+    """Write one slow statement to the log and the recent list."""
+    entry = {
+        "at": datetime.utcnow().isoformat() + "Z",
+        "duration_ms": round(elapsed * 1000, 3),
+        "sql": " ".join(sql.split()),
+        "parameters": parameter_shapes(parameters),
+        "plan": explain(conn, sql, parameters),
+    }
+    if executemany_count is not None:
+        entry["executemany_rows"] = executemany_count
+    recent_slow_queries.append(entry)
+    get_logger().info(json.dumps(entry))
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times each statement, including fetching its rows."""
+
+    def _start(self, sql: str, parameters, executemany_count: Optional[int] = None):
+        self._sql = sql
+        self._parameters = parameters
+        self._executemany_count = executemany_count
+        self._elapsed = 0.0
+        self._logged = False
+
+    def _add_time(self, started: float):
+        self._elapsed += time.perf_counter() - started
+        if not self._logged and self._elapsed >= threshold:
+            self._logged = True
+            record_slow_query(self.connection, self._sql, self._parameters, self._elapsed, self._executemany_count)
+
+    def execute(self, sql: str, parameters=()):
+        self._start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._add_time(started)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters[0] if seq_of_parameters else (), len(seq_of_parameters))
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._add_time(started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add_time(started)
+
+    def fetchmany(self, size: int = 1):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(size)
+        finally:
+            self._add_time(started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add_time(started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the ones behind execute(), are InstrumentedCursors."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
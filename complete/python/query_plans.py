@@ -0,0 +1,149 @@
+"""
+EXPLAIN QUERY PLAN regression check for the queries in database.py.
+
+Runs every database.py function against a scratch database, captures the SQL
+each one issues, and flags any statement whose plan scans a whole table
+instead of searching an index. Maintenance commands listed in
+FULL_SCAN_ALLOWED read every row by design; they still run, but their
+statements are not checked.
+"""
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from typing import Callable, List, NamedTuple, Optional
+
+import database
+from hot_set import HotSet
+from models import NewPostRequest, UpdatePostRequest, NewCommentRequest, UpdateCommentRequest
+
+
+CHECKED_PREFIXES = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+# database.py functions that read every row by design, and why; their statements are not checked
+FULL_SCAN_ALLOWED = {
+    "check_post_counters": "compares every post's counters with its likes and comments",
+    "rebuild_search_index": "reindexes every post and comment",
+    "rebuild_trending_scores": "recomputes the score of every post",
+}
+
+# Name of the FULL_SCAN_ALLOWED function running, while its statements are traced
+_allowed_scan: Optional[str] = None
+
+
+class PlanViolation(NamedTuple):
+    sql: str
+    detail: str
+
+
+def run_allowed_scan(function: Callable, *args, **kwargs):
+    """Call a FULL_SCAN_ALLOWED function, marking the statements it issues as exempt."""
+    global _allowed_scan
+    assert function.__name__ in FULL_SCAN_ALLOWED
+    _allowed_scan = function.__name__
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _allowed_scan = None
+
+
+def exercise_hot_set(post_id: str):
+    """Load a temporary hot set and drive the queries that keep it current."""
+    hot_set, hot_set_seq = database.hot_set, database._hot_set_seq
+    database.hot_set = HotSet(10)
+    try:
+        database.load_hot_set()
+        database.get_all_posts(limit=1)
+        database.add_like(post_id, "erin")
+        database.update_post(post_id, UpdatePostRequest(username="bob", content="Edited again"))
+        database.create_post(NewPostRequest(username="erin", content="Hot post"))
+    finally:
+        database.remove_change_listener(database.refresh_hot_set)
+        database.hot_set, database._hot_set_seq = hot_set, hot_set_seq
+
+
+def exercise_database():
+    """Call every public query function in database.py at least once, with the hot set and without."""
+    first = database.create_post(NewPostRequest(username="alice", content="First post"))
+    post = database.create_post(NewPostRequest(username="bob", content="Second post"))
+    _, next_cursor = database.get_all_posts(limit=1)
+    database.get_all_posts(limit=1, cursor=next_cursor)
+    _, next_cursor = database.get_all_posts(limit=1, username="bob")
+    database.get_all_posts(limit=1, cursor=next_cursor, username="bob")
+    for sort in ("top", "trending"):
+        _, next_cursor = database.get_all_posts(limit=1, sort=sort)
+        database.get_all_posts(limit=1, cursor=next_cursor, sort=sort)
+    database.get_post_by_id(post.id)
+    database.get_post_validators(post.id)
+    database.update_post(post.id, UpdatePostRequest(username="bob", content="Edited post"))
+
+    comment = database.create_comment(post.id, NewCommentRequest(username="alice", content="Nice"))
+    database.get_comments_by_post_id(post.id)
+    database.get_comments_rows_by_post_ids([first.id, post.id])
+    database.get_likes_rows_by_post_ids([first.id, post.id])
+    database.get_comment_by_id(post.id, comment.id)
+    database.update_comment(post.id, comment.id, UpdateCommentRequest(username="alice", content="Very nice"))
+    _, next_cursor = database.search_content("post", limit=1)
+    database.search_content("post", limit=1, cursor=next_cursor)
+
+    database.create_posts_batch([NewPostRequest(username="carol", content="Batched post")])
+    database.create_comments_batch(post.id, [NewCommentRequest(username="carol", content="Batched comment")])
+    database.add_likes_batch(post.id, ["carol", "dave"])
+    database.add_like(post.id, "alice")
+    _, next_cursor = database.get_likes_rows_by_username("carol", limit=1)
+    database.get_likes_rows_by_username("carol", limit=1, cursor=next_cursor)
+    database.remove_like(post.id, "alice")
+    database.delete_comment(post.id, comment.id)
+    database.delete_post(first.id)
+    database.refresh_trending_scores()
+    database.run_write(database.tag_origin(lambda conn: None))
+    exercise_hot_set(post.id)
+    run_allowed_scan(database.check_post_counters, repair=True)
+    run_allowed_scan(database.rebuild_search_index)
+    run_allowed_scan(database.rebuild_trending_scores)
+    page = database.get_changes_since(0, limit=5)
+    database.get_changes_since(page["nextSince"])
+
+    # Age the log on an untraced connection so pruning has rows to delete
+    with closing(sqlite3.connect(database.DATABASE_NAME)) as conn:
+        conn.execute("UPDATE changes SET changed_at = '2000-01-01T00:00:00.000Z'")
+        conn.commit()
+    database.prune_changes(retention_hours=1)
+
+
+def is_full_scan(detail: str) -> bool:
+    """A SCAN step that is not driven by an index reads the whole table."""
+    return detail.startswith("SCAN ") and "INDEX" not in detail and "CONSTANT ROW" not in detail
+
+
+def check_query_plans() -> List[PlanViolation]:
+    """Return every statement issued by database.py whose plan contains a full table scan."""
+    statements: List[tuple] = []
+    original_database = database.DATABASE_NAME
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        database.close_pool()
+        database.DATABASE_NAME = os.path.join(scratch_dir, "query_plans.db")
+        try:
+            database.init_database()
+            database.get_pool().on_connect = lambda conn: conn.set_trace_callback(
+                lambda sql: statements.append((sql, _allowed_scan))
+            )
+            exercise_database()
+        finally:
+            database.close_pool()
+            scratch_database = database.DATABASE_NAME
+            database.DATABASE_NAME = original_database
+
+        violations = []
+        with closing(sqlite3.connect(scratch_database)) as conn:
+            for sql in dict.fromkeys(sql.strip() for sql, allowed in statements if allowed is None):
+                if not sql.upper().startswith(CHECKED_PREFIXES):
+                    continue
+                # FTS5 reads its own shadow tables with statements like SELECT k, v FROM 'main'.'posts_fts_config'
+                if "'main'." in sql:
+                    continue
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                    if is_full_scan(row[3]):
+                        violations.append(PlanViolation(sql, row[3]))
+        return violations
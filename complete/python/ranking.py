@@ -0,0 +1,111 @@
+"""
+Scores behind the ranked feeds, `/api/posts?sort=top` and `sort=trending`.
+
+top:      likes + COMMENT_WEIGHT * comments of all time, a generated column
+          on posts that SQLite keeps current as the counter triggers run.
+trending: the same engagement, plus POST_WEIGHT for the post itself, with
+          every event decaying by half each SNS_TRENDING_HALF_LIFE_HOURS.
+
+Decay is applied without touching every post on every request: an event at
+time t is stored as weight * 2 ** ((t - epoch) / half_life), relative to a
+shared epoch in ranking_state. Since every score is scaled by the same
+factor as time passes, this ranks posts exactly as their decayed scores
+would. Writes add or subtract their event's weight, and a background
+refresh periodically moves the epoch to the present, rescaling stored
+scores so they stay readable (the decayed score as of the last refresh)
+and far from float overflow. Posts whose score decays below
+MIN_TRENDING_SCORE drop out of the trending feed.
+"""
+import math
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable
+
+
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("SNS_TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_REFRESH_INTERVAL = float(os.environ.get("SNS_TRENDING_REFRESH_INTERVAL", "600"))
+
+LIKE_WEIGHT = 1
+# A comment takes more effort than a like, so it counts as two
+COMMENT_WEIGHT = 2
+# A new post starts trending as if it had one like
+POST_WEIGHT = 1
+MIN_TRENDING_SCORE = 1e-6
+
+SORT_ORDERS = ("recent", "top", "trending")
+
+
+def decay_rate(half_life_hours: float = TRENDING_HALF_LIFE_HOURS) -> float:
+    """Exponential decay rate per second for a half-life in hours."""
+    return math.log(2) / (half_life_hours * 3600)
+
+
+def to_seconds(timestamp: str) -> float:
+    """Unix time of an ISO 8601 timestamp as stored by database.py."""
+    return datetime.fromisoformat(timestamp.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+
+
+def event_weight(timestamp: str, epoch: float, weight: float = 1) -> float:
+    """Stored weight of an event at `timestamp`, relative to the scores' epoch."""
+    return weight * math.exp(decay_rate() * (to_seconds(timestamp) - epoch))
+
+
+def get_epoch(conn: sqlite3.Connection) -> float:
+    return conn.execute("SELECT epoch FROM ranking_state WHERE id = 1").fetchone()[0]
+
+
+def add_trending_weight(conn: sqlite3.Connection, post_id: str, timestamps: Iterable[str], weight: float):
+    """Add (or, with a negative weight, remove) events to a post's trending score.
+
+    Runs inside the write's transaction, so the score changes atomically
+    with the like or comment that caused it.
+    """
+    epoch = get_epoch(conn)
+    delta = sum(event_weight(timestamp, epoch, weight) for timestamp in timestamps)
+    if not delta:
+        return
+    conn.execute("""
+        UPDATE posts
+        SET trending_score = CASE WHEN trending_score + ? < ? THEN 0 ELSE trending_score + ? END
+        WHERE id = ?
+    """, (delta, MIN_TRENDING_SCORE, delta, post_id))
+
+
+def rebase_trending_scores(conn: sqlite3.Connection, now: float) -> int:
+    """Move the epoch to `now`, rescaling every score to match; returns the posts still trending."""
+    factor = math.exp(-decay_rate() * (now - get_epoch(conn)))
+    conn.execute("""
+        UPDATE posts
+        SET trending_score = CASE WHEN trending_score * ? < ? THEN 0 ELSE trending_score * ? END
+        WHERE trending_score > 0
+    """, (factor, MIN_TRENDING_SCORE, factor))
+    conn.execute("UPDATE ranking_state SET epoch = ? WHERE id = 1", (now,))
+    return conn.execute("SELECT COUNT(*) FROM posts WHERE trending_score > 0").fetchone()[0]
+
+
+def recompute_trending_scores(conn: sqlite3.Connection, now: float) -> int:
+    """Recompute every trending score from posts, likes and comments; returns the posts trending.
+
+    Needed after rows are loaded without going through database.py, or when
+    the half-life changes.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for table, post_column, timestamp_column, weight in (
+        ("posts", "id", "created_at", POST_WEIGHT),
+        ("likes", "post_id", "liked_at", LIKE_WEIGHT),
+        ("comments", "post_id", "created_at", COMMENT_WEIGHT),
+    ):
+        for post_id, timestamp in conn.execute(f"SELECT {post_column}, {timestamp_column} FROM {table}"):
+            scores[post_id] += event_weight(timestamp, now, weight)
+
+    conn.execute("UPDATE posts SET trending_score = 0 WHERE trending_score > 0")
+    trending = [(score, post_id) for post_id, score in scores.items() if score >= MIN_TRENDING_SCORE]
+    conn.executemany("UPDATE posts SET trending_score = ? WHERE id = ?", trending)
+    conn.execute("""
+        INSERT INTO ranking_state (id, epoch, half_life_hours) VALUES (1, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET epoch = excluded.epoch, half_life_hours = excluded.half_life_hours
+    """, (now, TRENDING_HALF_LIFE_HOURS))
+    return len(trending)
+
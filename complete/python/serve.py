@@ -0,0 +1,42 @@
+"""
+Launcher for the SNS API, in single- or multi-worker mode.
+
+Usage:
+    python serve.py                      # one worker
+    python serve.py --workers 4          # four worker processes sharing sns_api.db
+
+Migrations are applied once here, before any worker starts. With more than
+one worker, every worker runs a change watcher (SNS_WATCH_CHANGES=1) so its
+post cache and /api/stream subscribers see the other workers' writes.
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the SNS API")
+    parser.add_argument("--host", default=os.environ.get("SNS_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SNS_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SNS_WORKERS", "1")))
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # Read by each worker process when it imports database.py
+        os.environ.setdefault("SNS_WATCH_CHANGES", "1")
+
+    from database import init_database
+    init_database()
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=5,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Forged pagination cursors must be rejected with 400, never reach a query.
+
+Run from complete/python:
+    python -m pytest tests
+"""
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import main
+from pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def forge_cursor(values) -> str:
+    """Encode arbitrary JSON the way encode_cursor does, as a client could."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    database.DATABASE_NAME = str(tmp_path_factory.mktemp("cursors") / "sns_api.db")
+    with TestClient(main.app) as client:
+        for i in range(3):
+            client.post("/api/posts", json={"username": "alice", "content": f"post {i}"})
+        yield client
+
+
+def test_decode_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2024-01-01T00:00:00Z", "abc"), 2) == ("2024-01-01T00:00:00Z", "abc")
+
+
+@pytest.mark.parametrize("values", [[[1], {}], ["x", None], [True, "x"], ["x"]])
+def test_decode_cursor_rejects_non_scalars(values):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(forge_cursor(values), 2)
+
+
+def test_decode_cursor_checks_types():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(forge_cursor([1, "x"]), 2, [(str,), (str,)])
+
+
+@pytest.mark.parametrize("values", [[[1], {}], [["x"], "y"], [1.5, None]])
+def test_posts_rejects_forged_cursor(client, values):
+    response = client.get("/api/posts", params={"cursor": forge_cursor(values)})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("values", [[[1], "x"], [1, "x"], ["x", 2]])
+def test_user_likes_rejects_forged_cursor(client, values):
+    response = client.get("/api/users/alice/likes", params={"cursor": forge_cursor(values)})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("values", [[1.0, ["x"], "y"], [1.0, "post", {}], ["1.0", "post", "y"], [True, "post", "y"]])
+def test_search_rejects_forged_cursor(client, values):
+    response = client.get("/api/search", params={"q": "post", "cursor": forge_cursor(values)})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("sort, values", [
+    ("top", ["x", "id"]),
+    ("top", [1, ["id"]]),
+    ("trending", [1.0, ["id"], 0]),
+    ("trending", [1.0, "id", "0"]),
+    ("trending", [1.0, "id", 1e300]),
+])
+def test_ranked_feeds_reject_forged_cursor(client, sort, values):
+    response = client.get("/api/posts", params={"sort": sort, "cursor": forge_cursor(values)})
+    assert response.status_code == 400
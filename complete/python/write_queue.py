@@ -0,0 +1,142 @@
+"""
+Group-commit write queue for the SNS API.
+
+A single writer thread owns one connection. Callers submit write operations
+(functions that take a connection and return a result); the writer collects
+them for up to `window` seconds or `max_batch` operations, runs each one
+inside its own savepoint of a shared transaction, commits once, and resolves
+every caller's future with its own result or exception. Concurrent small
+writes then cost one commit per batch instead of one each, and never contend
+with each other for SQLite's write lock.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple, TypeVar
+
+from db_pool import connect
+
+
+WRITE_QUEUE_ENABLED = os.environ.get("SNS_WRITE_QUEUE", "").lower() in ("1", "true", "yes")
+WRITE_BATCH_WINDOW_MS = float(os.environ.get("SNS_WRITE_BATCH_WINDOW_MS", "2"))
+WRITE_BATCH_MAX = int(os.environ.get("SNS_WRITE_BATCH_MAX", "64"))
+
+T = TypeVar("T")
+WriteOperation = Callable[[sqlite3.Connection], T]
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Single-writer queue that coalesces concurrent writes into group commits."""
+
+    def __init__(self, database: str, window: float = WRITE_BATCH_WINDOW_MS / 1000, max_batch: int = WRITE_BATCH_MAX):
+        self.database = database
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "operations": 0,
+            "failed_operations": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "largest_batch": 0,
+        }
+        self._thread = threading.Thread(target=self._run, name="sns-db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: WriteOperation) -> Future:
+        """Queue a write operation and return a future resolved after its batch commits."""
+        future: Future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def _collect_batch(self, first) -> List[Tuple[WriteOperation, Future]]:
+        """Gather more operations until the window closes or the batch is full."""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        conn = connect(self.database)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                self._commit_batch(conn, self._collect_batch(item))
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[Tuple[WriteOperation, Future]]):
+        """Run a batch in one transaction, isolating each operation in a savepoint."""
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, future in batch:
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    result = operation(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((future, None, e))
+                    continue
+                conn.execute("RELEASE write_op")
+                outcomes.append((future, result, None))
+            conn.commit()
+        except Exception as e:
+            # The shared transaction failed as a whole (e.g. the database is locked by another process)
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["failed_batches"] += 1
+                self._stats["operations"] += len(batch)
+                self._stats["failed_operations"] += len(batch)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["operations"] += len(batch)
+            self._stats["failed_operations"] += sum(1 for _, _, error in outcomes if error is not None)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Snapshot of batching counters for monitoring."""
+        with self._lock:
+            batches = self._stats["batches"]
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "pending": self._queue.qsize(),
+                "average_batch": round(self._stats["operations"] / batches, 2) if batches else 0,
+                **self._stats,
+            }
+
+    def close(self):
+        """Finish queued operations and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
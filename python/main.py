@@ -1,7 +1,7 @@
 # FastAPI SNS API implementation matching openapi.yaml
 import os
 import yaml
-from fastapi import FastAPI, HTTPException, Request, Response, status, Depends
+from fastapi import FastAPI, HTTPException, Request, Response, status, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.openapi.docs import get_swagger_ui_html
@@ -95,6 +95,7 @@ class Post(BaseModel):
     createdAt: str
     updatedAt: str
     comments: List[Comment] = []
+    commentsCount: int = 0
     likes: int
 
 class PostCreateRequest(BaseModel):
@@ -125,6 +126,38 @@ def get_likes_count(conn, post_id: str) -> int:
     row = conn.execute("SELECT COUNT(*) as cnt FROM likes WHERE postId = ?", (post_id,)).fetchone()
     return row["cnt"] if row else 0
 
+# Batched loaders: one query per chunk of posts instead of one per post
+BATCH_SIZE = 500
+
+def chunked(items: List[str], size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def get_comments_by_posts(conn, post_ids: List[str], limit: Optional[int] = None) -> dict:
+    """Comments for many posts grouped by post id; only the latest `limit` per post when set."""
+    grouped = {post_id: [] for post_id in post_ids}
+    for chunk in chunked(post_ids):
+        placeholders = ",".join("?" * len(chunk))
+        if limit is None:
+            rows = conn.execute(f"SELECT * FROM comments WHERE postId IN ({placeholders}) ORDER BY createdAt ASC", chunk).fetchall()
+        else:
+            rows = conn.execute(f"""SELECT id, postId, username, content, createdAt, updatedAt FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY postId ORDER BY createdAt DESC) AS rn
+                FROM comments WHERE postId IN ({placeholders})
+            ) WHERE rn <= ? ORDER BY createdAt ASC""", [*chunk, limit]).fetchall()
+        for row in rows:
+            grouped[row["postId"]].append(dict(row))
+    return grouped
+
+def count_by_posts(conn, table: str, post_ids: List[str]) -> dict:
+    """Row counts of `table` (comments or likes) for many posts, keyed by post id."""
+    counts = dict.fromkeys(post_ids, 0)
+    for chunk in chunked(post_ids):
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT postId, COUNT(*) as cnt FROM {table} WHERE postId IN ({placeholders}) GROUP BY postId", chunk).fetchall()
+        counts.update((row["postId"], row["cnt"]) for row in rows)
+    return counts
+
 def get_comment_by_id(conn, post_id: str, comment_id: str):
     comment = conn.execute("SELECT * FROM comments WHERE id = ? AND postId = ?", (comment_id, post_id)).fetchone()
     return comment
@@ -132,14 +165,17 @@ def get_comment_by_id(conn, post_id: str, comment_id: str):
 # --- API Endpoints ---
 # /posts GET
 @app.get("/posts", response_model=List[Post], responses={500: {"model": Error}})
-def list_posts(db=Depends(get_db)):
+def list_posts(comments_limit: Optional[int] = Query(None, ge=0, description="Embed only the latest N comments per post"), db=Depends(get_db)):
     try:
         posts = db.execute("SELECT * FROM posts ORDER BY createdAt DESC").fetchall()
+        post_ids = [post["id"] for post in posts]
+        comments_by_post = get_comments_by_posts(db, post_ids, comments_limit)
+        likes_by_post = count_by_posts(db, "likes", post_ids)
+        comments_count_by_post = count_by_posts(db, "comments", post_ids) if comments_limit is not None else None
         result = []
         for post in posts:
             post_id = post["id"]
-            comments = [Comment(**c) for c in get_comments_by_post(db, post_id)]
-            likes = get_likes_count(db, post_id)
+            comments = [Comment(**c) for c in comments_by_post[post_id]]
             result.append(Post(
                 id=post["id"],
                 username=post["username"],
@@ -147,7 +183,8 @@ def list_posts(db=Depends(get_db)):
                 createdAt=post["createdAt"],
                 updatedAt=post["updatedAt"],
                 comments=comments,
-                likes=likes
+                commentsCount=comments_count_by_post[post_id] if comments_count_by_post is not None else len(comments),
+                likes=likes_by_post[post_id]
             ))
         return result
     except Exception as e:
@@ -191,6 +228,7 @@ def get_post(postId: str, db=Depends(get_db)):
         createdAt=post["createdAt"],
         updatedAt=post["updatedAt"],
         comments=comments,
+        commentsCount=len(comments),
         likes=likes
     )
 
@@ -216,6 +254,7 @@ def update_post(postId: str, body: PostUpdateRequest, db=Depends(get_db)):
             createdAt=post["createdAt"],
             updatedAt=now,
             comments=comments,
+            commentsCount=len(comments),
             likes=likes
         )
     except Exception as e: